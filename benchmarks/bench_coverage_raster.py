@@ -0,0 +1,52 @@
+import time
+
+from benchmarks.synthetic import CENTER_LAT, CENTER_LON, generate_random_walk
+from geo_area_calculator import (
+    calculate_coverage_ratio,
+    calculate_coverage_ratio_raster,
+    calculate_total_polygon,
+)
+from objective_score import BUFFER_METERS, COVERAGE_RADIUS_METERS
+
+# リポジトリのルートから python -m benchmarks.bench_coverage_raster で実行する
+
+SIZES = [100, 1000, 10000, 100000]
+CELL_METERS = [10.0, 5.0, 2.0]
+
+
+def main():
+    # 厳密な計算（和集合の作成と交差部分の面積）と格子による近似の時間と誤差を比べる
+    print(
+        f"{'points':>8} {'cell[m]':>8} {'exact':>8} {'raster':>8}"
+        f" {'abs error':>10} {'exact[s]':>9} {'raster[s]':>10} {'speedup':>8}"
+    )
+    for num_points in SIZES:
+        coordinates = generate_random_walk(num_points)
+
+        start = time.perf_counter()
+        total_poly = calculate_total_polygon(coordinates, BUFFER_METERS)
+        exact = calculate_coverage_ratio(
+            CENTER_LAT, CENTER_LON, COVERAGE_RADIUS_METERS, total_poly
+        )
+        exact_time = time.perf_counter() - start
+
+        for cell_meters in CELL_METERS:
+            start = time.perf_counter()
+            raster = calculate_coverage_ratio_raster(
+                CENTER_LAT,
+                CENTER_LON,
+                COVERAGE_RADIUS_METERS,
+                coordinates,
+                BUFFER_METERS,
+                cell_meters,
+            )
+            raster_time = time.perf_counter() - start
+            print(
+                f"{num_points:>8} {cell_meters:>8.1f} {exact:>8.4f} {raster:>8.4f}"
+                f" {abs(raster - exact):>10.2e} {exact_time:>9.4f}"
+                f" {raster_time:>10.4f} {exact_time / raster_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
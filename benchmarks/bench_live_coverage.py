@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import (
+    CENTER_LAT,
+    CENTER_LON,
+    generate_confined_random_walk,
+    generate_synthetic_location_history,
+)
+from geo_area_calculator import calculate_coverage_ratio, calculate_total_area
+from live_coverage import LiveCoverage
+from main import parse_location_records
+from objective_score import BUFFER_METERS, COVERAGE_RADIUS_METERS
+from trajectory import extract_trajectory_arrays
+
+# リポジトリのルートから python -m benchmarks.bench_live_coverage で実行する
+
+SIZES = [100, 1000, 10000]
+# 拠点駅の周辺だけを歩き回る軌跡の点数（同じ場所を何度も通る場合の計算量を確かめる）
+CONFINED_SIZES = [1000, 4000, 8000, 16000]
+
+
+def _report(
+    label: str,
+    size: int,
+    timings: list[float],
+    recompute_time: float,
+    live: LiveCoverage,
+    total_area: float,
+    ratio: float,
+) -> None:
+    print(
+        f"{label:>9} {size:>8} {sum(timings) / len(timings) * 1000:>14.3f}"
+        f" {max(timings) * 1000:>13.3f} {recompute_time * 1000:>14.3f}"
+        f" {abs(live.total_area - total_area) / total_area:>11.2e}"
+        f" {abs(live.coverage_ratio - ratio):>15.2e}"
+    )
+
+
+def _recompute(coordinates: np.ndarray | list) -> tuple[float, float, float]:
+    # 全体を計算し直す時間と、総移動面積と網羅率
+    start = time.perf_counter()
+    total_area, total_poly = calculate_total_area(coordinates, BUFFER_METERS)
+    ratio = calculate_coverage_ratio(
+        CENTER_LAT, CENTER_LON, COVERAGE_RADIUS_METERS, total_poly
+    )
+    return time.perf_counter() - start, total_area, ratio
+
+
+def main():
+    # 記録を1件ずつ追加してスコアを取得する時間と、全体を計算し直す時間を比べる
+    print(
+        f"{'path':>9} {'size':>8} {'live mean[ms]':>14} {'live max[ms]':>13}"
+        f" {'recompute[ms]':>14} {'area error':>11} {'coverage error':>15}"
+    )
+    for num_records in SIZES:
+        locate_histories = list(
+            parse_location_records(generate_synthetic_location_history(num_records))
+        )
+
+        live = LiveCoverage(CENTER_LAT, CENTER_LON)
+        timings = []
+        for locate_history in locate_histories:
+            start = time.perf_counter()
+            live.append(locate_history)
+            live.coverage_ratio
+            timings.append(time.perf_counter() - start)
+
+        coordinates = extract_trajectory_arrays(locate_histories).latlon
+        recompute_time, total_area, ratio = _recompute(coordinates)
+        _report(
+            "drifting", num_records, timings, recompute_time, live, total_area, ratio
+        )
+
+    # 点を1つずつ追加してスコアを取得する。1点あたりの時間が点数によらないことを確かめる
+    for num_points in CONFINED_SIZES:
+        coordinates = generate_confined_random_walk(num_points)
+
+        live = LiveCoverage(CENTER_LAT, CENTER_LON)
+        timings = []
+        for lat, lon in coordinates:
+            start = time.perf_counter()
+            live.append_point(lat, lon)
+            live.coverage_ratio
+            timings.append(time.perf_counter() - start)
+
+        recompute_time, total_area, ratio = _recompute(coordinates)
+        _report(
+            "confined", num_points, timings, recompute_time, live, total_area, ratio
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import write_synthetic_location_history
+from main import load_location_history_list
+from trajectory import extract_trajectory_arrays
+
+# リポジトリのルートから python -m benchmarks.bench_location_history で実行する
+
+SIZES = [1000, 10000, 100000]
+REPEAT = 5
+
+
+def measure(filepath: str, fast: bool) -> tuple[float, float, float]:
+    # 読み込み時間と、座標の配列の取り出しまで含めた時間（秒、REPEAT回の中央値）と、
+    # 読み込んだレコードが保持するメモリのピーク（MB）
+    # tracemallocは計測対象を遅くするため、時間とメモリは別々に計測する
+    load_timings, total_timings = [], []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        locate_histories = load_location_history_list(filepath, fast=fast)
+        loaded = time.perf_counter()
+        extract_trajectory_arrays(locate_histories)
+        load_timings.append(loaded - start)
+        total_timings.append(time.perf_counter() - start)
+        del locate_histories
+
+    tracemalloc.start()
+    locate_histories = load_location_history_list(filepath, fast=fast)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del locate_histories
+    return (
+        statistics.median(load_timings),
+        statistics.median(total_timings),
+        peak / 1024 / 1024,
+    )
+
+
+def main():
+    print(
+        f"{'records':>8} {'pydantic[s]':>12} {'fast[s]':>8}"
+        f" {'pydantic+extract[s]':>20} {'fast+extract[s]':>16}"
+        f" {'pydantic[MB]':>13} {'fast[MB]':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_records in SIZES:
+            filepath = os.path.join(tmp_dir, f"location-history_{num_records}.json")
+            write_synthetic_location_history(filepath, num_records)
+            slow_time, slow_total, slow_peak = measure(filepath, fast=False)
+            fast_time, fast_total, fast_peak = measure(filepath, fast=True)
+            print(
+                f"{num_records:>8} {slow_time:>12.3f} {fast_time:>8.3f}"
+                f" {slow_total:>20.3f} {fast_total:>16.3f}"
+                f" {slow_peak:>13.1f} {fast_peak:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable
+
+from benchmarks.synthetic import (
+    CENTER_LAT,
+    CENTER_LON,
+    NUM_PLACE_IDS,
+    generate_random_walk,
+    generate_synthetic_location_history,
+    generate_synthetic_place_details,
+    synthetic_place_id,
+    write_synthetic_location_history,
+    write_synthetic_step_count,
+)
+from geo_area_calculator import (
+    calculate_coverage_ratio,
+    calculate_coverage_ratio_raster,
+    calculate_total_area,
+    calculate_total_polygon,
+)
+from coverage_query import PreparedCoverage
+from main import load_location_history_list, parse_location_records
+from models.GooglePlaceDetail import GooglePlaceDetail
+from objective_score import (
+    BUFFER_METERS,
+    COVERAGE_RADIUS_METERS,
+    calculate_diversity_score,
+    split_location_history,
+)
+from reporter import QuietReporter
+from step_count_store import build_step_count_store
+
+# リポジトリのルートから python -m benchmarks.bench_pipeline で実行する
+# 結果はJSONで書き出し、--baselineに以前の結果を渡すと遅くなった計測を報告する
+
+SIZES = [100, 1000, 10000]
+REPEAT = 3
+RESULTS_PATH = "bench_results.json"
+# 網羅率をまとめて求める計測で使う、拠点の候補と半径
+COVERAGE_GRID_CENTERS = [
+    (CENTER_LAT, CENTER_LON),
+    (35.6200, 139.5700),
+    (35.6100, 139.5500),
+]
+COVERAGE_GRID_RADII = [300.0, 600.0, 1200.0, 2400.0]
+# ベースラインの中央値からこの割合以上遅くなったものを劣化とみなす
+REGRESSION_THRESHOLD = 0.5
+
+
+def time_case(func: Callable[[], object], repeat: int) -> dict[str, float]:
+    # 1回目はキャッシュなどの準備を含むため、計測から除く
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min_seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "max_seconds": max(timings),
+    }
+
+
+def build_cases(size: int, tmp_dir: str) -> dict[str, Callable[[], object]]:
+    # 段階ごとの計測対象。sizeはレコード数、点数、訪問数、歩数のサンプル数として使う
+    history_path = os.path.join(tmp_dir, f"location-history_{size}.json")
+    write_synthetic_location_history(history_path, size)
+
+    coordinates = generate_random_walk(size)
+    total_poly = calculate_total_polygon(coordinates, BUFFER_METERS)
+
+    visits, _ = split_location_history(
+        list(parse_location_records(generate_synthetic_location_history(size * 2)))
+    )
+    place_details = generate_synthetic_place_details(
+        [synthetic_place_id(i) for i in range(NUM_PLACE_IDS)]
+    )
+    places = {
+        place_id: GooglePlaceDetail(**detail)
+        for place_id, detail in place_details.items()
+    }
+    reporter = QuietReporter()
+
+    step_count_path = os.path.join(tmp_dir, f"StepCount_{size}.json")
+    step_count_prefix = os.path.join(tmp_dir, f"StepCount_{size}")
+    write_synthetic_step_count(step_count_path, size)
+    series = build_step_count_store(step_count_path, step_count_prefix)
+
+    return {
+        "load_location_history": lambda: load_location_history_list(history_path),
+        "load_location_history_fast": lambda: load_location_history_list(
+            history_path, fast=True
+        ),
+        "calculate_total_area": lambda: calculate_total_area(
+            coordinates, BUFFER_METERS
+        ),
+        "calculate_coverage_ratio": lambda: calculate_coverage_ratio(
+            CENTER_LAT, CENTER_LON, COVERAGE_RADIUS_METERS, total_poly
+        ),
+        "coverage_ratio_grid_unprepared": lambda: [
+            calculate_coverage_ratio(center_lat, center_lon, radius, total_poly)
+            for center_lat, center_lon in COVERAGE_GRID_CENTERS
+            for radius in COVERAGE_GRID_RADII
+        ],
+        "coverage_ratio_grid_prepared": lambda: PreparedCoverage(total_poly).ratio_grid(
+            COVERAGE_GRID_CENTERS, COVERAGE_GRID_RADII
+        ),
+        "calculate_coverage_ratio_raster": lambda: calculate_coverage_ratio_raster(
+            CENTER_LAT, CENTER_LON, COVERAGE_RADIUS_METERS, coordinates, BUFFER_METERS
+        ),
+        "calculate_diversity_score": lambda: calculate_diversity_score(
+            visits, places, reporter
+        ),
+        "build_step_count_store": lambda: build_step_count_store(
+            step_count_path, step_count_prefix
+        ),
+        "step_count_window_sum": lambda: series.window_sum(
+            int(series.epoch[0]), int(series.epoch[-1])
+        ),
+    }
+
+
+def run_benchmarks(sizes: list[int], repeat: int) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            for stage, func in build_cases(size, tmp_dir).items():
+                result = {"stage": stage, "size": size, "repeat": repeat}
+                result.update(time_case(func, repeat))
+                results.append(result)
+                print(
+                    f"{stage:>32} {size:>8} {result['median_seconds']:>12.6f}",
+                    flush=True,
+                )
+    return {
+        "created_at": datetime.now().astimezone().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def find_regressions(
+    report: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD
+) -> list[str]:
+    # ベースラインと同じ段階・サイズの計測だけを、中央値で比べる
+    baseline_results = {
+        (result["stage"], result["size"]): result for result in baseline["results"]
+    }
+    regressions = []
+    for result in report["results"]:
+        key = (result["stage"], result["size"])
+        if key not in baseline_results:
+            continue
+        before = baseline_results[key]["median_seconds"]
+        after = result["median_seconds"]
+        if after > before * (1 + threshold):
+            regressions.append(
+                f"{result['stage']} (size={result['size']}):"
+                f" {before:.6f}s -> {after:.6f}s"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スコア計算の各段階の計測")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", help="比較対象とする以前の計測結果のJSON")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    print(f"{'stage':>32} {'size':>8} {'median[s]':>12}")
+    report = run_benchmarks(args.sizes, args.repeat)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to '{args.output}'")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
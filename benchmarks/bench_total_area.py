@@ -0,0 +1,61 @@
+import math
+import time
+
+from shapely.geometry import Polygon
+
+from benchmarks.synthetic import generate_random_walk
+from geo_area_calculator import calculate_area_moved, calculate_total_polygon
+
+# リポジトリのルートから python -m benchmarks.bench_total_area で実行する
+
+SIZES = [10, 1000, 100000]
+# 逐次unionは点数の2乗に比例して遅くなるため、これより多い点数では計測しない
+MAX_INCREMENTAL_POINTS = 5000
+# calculate_total_polygonと逐次unionの面積の許容誤差（相対値）
+AREA_TOLERANCE = 1e-3
+
+
+def calculate_total_poly_incremental(
+    coordinates: list[tuple[float, float]], buffer_meters: float
+) -> Polygon:
+    # 変更前の実装：区間ごとにバッファを作り、1つずつunionする
+    total_poly = Polygon()
+    for i in range(len(coordinates) - 1):
+        lat1, lon1 = coordinates[i]
+        lat2, lon2 = coordinates[i + 1]
+        line_poly = calculate_area_moved(lat1, lon1, lat2, lon2, buffer_meters)
+        total_poly = total_poly.union(line_poly)
+    return total_poly
+
+
+def main():
+    buffer_meters = 80.0
+    # 投影による面積計算は両者で共通なので、和集合の作成部分のみを計測する
+    print(f"{'points':>8} {'bulk[s]':>10} {'incremental[s]':>15} {'area diff':>10}")
+    for num_points in SIZES:
+        coordinates = generate_random_walk(num_points)
+
+        start = time.perf_counter()
+        total_poly = calculate_total_polygon(coordinates, buffer_meters)
+        bulk_time = time.perf_counter() - start
+
+        if num_points > MAX_INCREMENTAL_POINTS:
+            print(f"{num_points:>8} {bulk_time:>10.4f} {'skipped':>15} {'-':>10}")
+            continue
+
+        start = time.perf_counter()
+        incremental_poly = calculate_total_poly_incremental(coordinates, buffer_meters)
+        incremental_time = time.perf_counter() - start
+
+        area_diff = (
+            math.fabs(total_poly.area - incremental_poly.area) / incremental_poly.area
+        )
+        assert area_diff < AREA_TOLERANCE, area_diff
+        print(
+            f"{num_points:>8} {bulk_time:>10.4f} {incremental_time:>15.4f}"
+            f" {area_diff:>10.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
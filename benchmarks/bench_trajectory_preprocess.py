@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+import shapely
+
+from benchmarks.synthetic import (
+    generate_synthetic_location_history,
+    generate_trajectory_with_stays,
+)
+from geo_area_calculator import calculate_projected_area, calculate_total_polygon
+from main import parse_location_records
+from objective_score import BUFFER_METERS, TRAJECTORY_TOLERANCE_METERS
+from trajectory import extract_trajectory_arrays, preprocess_trajectory
+
+# リポジトリのルートから python -m benchmarks.bench_trajectory_preprocess で実行する
+
+SIZES = [500, 1000, 10000, 100000]
+TOLERANCE_METERS = [TRAJECTORY_TOLERANCE_METERS, TRAJECTORY_TOLERANCE_METERS * 2]
+
+
+def generate_trajectories(num_points: int) -> dict[str, np.ndarray]:
+    timeline = extract_trajectory_arrays(
+        list(parse_location_records(generate_synthetic_location_history(num_points)))
+    ).latlon
+    stays = np.array(generate_trajectory_with_stays(num_points))
+    return {"timeline": timeline, "stays": stays}
+
+
+def main():
+    # 前処理で減った点の数と、和集合の作成時間、総移動面積の相対誤差
+    print(
+        f"{'trajectory':>10} {'points':>8} {'tol[m]':>7} {'kept':>8}"
+        f" {'union[s]':>9} {'prep+union[s]':>14} {'vertices':>9} {'area error':>11}"
+    )
+    for num_points in SIZES:
+        for name, latlon in generate_trajectories(num_points).items():
+            start = time.perf_counter()
+            total_poly = calculate_total_polygon(latlon, BUFFER_METERS)
+            union_time = time.perf_counter() - start
+            total_area = calculate_projected_area(total_poly)
+
+            for tolerance_meters in TOLERANCE_METERS:
+                start = time.perf_counter()
+                simplified = preprocess_trajectory(latlon, tolerance_meters)
+                simplified_poly = calculate_total_polygon(simplified, BUFFER_METERS)
+                simplified_time = time.perf_counter() - start
+                area_error = (
+                    calculate_projected_area(simplified_poly) - total_area
+                ) / total_area
+                print(
+                    f"{name:>10} {len(latlon):>8} {tolerance_meters:>7.1f}"
+                    f" {len(simplified):>8} {union_time:>9.4f}"
+                    f" {simplified_time:>14.4f}"
+                    f" {shapely.get_num_coordinates(simplified_poly):>9}"
+                    f" {area_error:>11.2e}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import google_places
+import places_cache
+from benchmarks.synthetic import generate_synthetic_place_details
+from google_places import RateLimiter, create_session, get_google_place_details
+from places_cache import PlacesCache, SqlitePlacesStore
+
+# リポジトリのルートから python -m benchmarks.check_google_places で実行する
+# Places APIを模したローカルのスタブサーバーに対して、キャッシュ・再試行・エラー・
+# レート制限の動作を確かめる（失敗した項目があれば終了コード1で終わる）
+
+# placeIDの接頭辞ごとに、スタブサーバーの応答を変える
+#   ok_       常に200
+#   flaky_    1回目は503、2回目以降は200
+#   limited_  1回目は429、2回目以降は200
+#   stall_    1回目はタイムアウトより長く待たせ、2回目以降は200
+#   slow_     少し待たせてから200（並行して接続が開かれるようにする）
+#   missing_  常に404
+#   denied_   常に403
+STALL_SECONDS = 1.0
+SLOW_SECONDS = 0.05
+RATE_LIMIT_PER_SECOND = 20.0
+RATE_LIMIT_REQUESTS = 10
+POOL_WORKERS = 32
+POOL_REQUESTS = 128
+
+
+class StubPlacesHandler(BaseHTTPRequestHandler):
+    requests_by_place_id: dict[str, list[float]] = defaultdict(list)
+    lock = threading.Lock()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _send_json(self, status: int, body: object) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # タイムアウトしたクライアントは既に接続を閉じている
+            pass
+
+    def do_GET(self):
+        place_id = urlparse(self.path).path.rsplit("/", 1)[-1]
+        with self.lock:
+            self.requests_by_place_id[place_id].append(time.monotonic())
+            first = len(self.requests_by_place_id[place_id]) == 1
+        prefix = place_id.split("_", 1)[0]
+        if prefix == "missing":
+            self._send_json(404, {"error": {"code": 404, "status": "NOT_FOUND"}})
+        elif prefix == "denied":
+            self._send_json(403, {"error": {"code": 403, "status": "DENIED"}})
+        elif prefix == "flaky" and first:
+            self._send_json(503, {"error": {"code": 503, "status": "UNAVAILABLE"}})
+        elif prefix == "limited" and first:
+            self._send_json(429, {"error": {"code": 429, "status": "EXHAUSTED"}})
+        else:
+            if prefix == "stall" and first:
+                time.sleep(STALL_SECONDS)
+            elif prefix == "slow":
+                time.sleep(SLOW_SECONDS)
+            self._send_json(200, generate_synthetic_place_details([place_id])[place_id])
+
+
+def request_count(place_id: str) -> int:
+    return len(StubPlacesHandler.requests_by_place_id[place_id])
+
+
+def run_checks(cache: PlacesCache) -> list[tuple[str, bool]]:
+    session = create_session()
+    results = []
+
+    def fetch(place_id: str, rate_limiter: RateLimiter | None = None):
+        return get_google_place_details(
+            place_id, session=session, rate_limiter=rate_limiter, cache=cache
+        )
+
+    detail = fetch("ok_1")
+    cached = fetch("ok_1")
+    results.append(
+        (
+            "cache hit after the first fetch",
+            detail is not None and cached == detail and request_count("ok_1") == 1,
+        )
+    )
+
+    detail = fetch("flaky_1")
+    results.append(
+        ("5xx is retried", detail is not None and request_count("flaky_1") == 2)
+    )
+
+    detail = fetch("limited_1")
+    results.append(
+        ("429 is retried", detail is not None and request_count("limited_1") == 2)
+    )
+
+    detail = fetch("stall_1")
+    results.append(
+        (
+            "stalled response times out and is retried",
+            detail is not None and request_count("stall_1") == 2,
+        )
+    )
+
+    first = fetch("missing_1")
+    second = fetch("missing_1")
+    results.append(
+        (
+            "404 is cached as missing",
+            first is None and second is None and request_count("missing_1") == 1,
+        )
+    )
+
+    try:
+        fetch("denied_1")
+        raised = False
+    except Exception:
+        raised = True
+    results.append(("other 4xx raises", raised and request_count("denied_1") == 1))
+
+    rate_limiter = RateLimiter(RATE_LIMIT_PER_SECOND)
+    place_ids = [f"ok_rate_{i}" for i in range(RATE_LIMIT_REQUESTS)]
+    with ThreadPoolExecutor(max_workers=google_places.DEFAULT_MAX_WORKERS) as executor:
+        list(executor.map(lambda place_id: fetch(place_id, rate_limiter), place_ids))
+    times = sorted(StubPlacesHandler.requests_by_place_id[p][0] for p in place_ids)
+    # 時刻の計測の誤差を見込み、間隔の1割までの短縮は許す
+    min_elapsed = (len(times) - 1) / RATE_LIMIT_PER_SECOND * 0.9
+    results.append(
+        (
+            f"rate limit of {RATE_LIMIT_PER_SECOND:g} requests per second",
+            times[-1] - times[0] >= min_elapsed,
+        )
+    )
+    # 並行数が既定より多くても、接続プールがあふれて接続が捨てられないこと
+    discarded = []
+    handler = logging.Handler()
+    handler.emit = lambda record: discarded.append(record.getMessage())
+    pool_logger = logging.getLogger("urllib3.connectionpool")
+    pool_logger.addHandler(handler)
+    places_cache._PLACES_CACHE = cache
+    try:
+        google_places._get_google_place_details_batch(
+            [f"slow_{i}" for i in range(POOL_REQUESTS)],
+            max_workers=POOL_WORKERS,
+            max_requests_per_second=0,
+        )
+    finally:
+        pool_logger.removeHandler(handler)
+        places_cache._PLACES_CACHE = None
+    results.append(
+        (
+            f"{POOL_WORKERS} workers reuse pooled connections",
+            not any("pool is full" in message for message in discarded),
+        )
+    )
+    return results
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPlacesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    google_places.GOOGLE_MAPS_API_KEY = "stub"
+    google_places.GOOGLE_PLACES_API_URL = (
+        f"http://127.0.0.1:{server.server_address[1]}/v1/places"
+    )
+    google_places.BACKOFF_BASE_SECONDS = 0.05
+    google_places.REQUEST_TIMEOUT_SECONDS = (1.0, STALL_SECONDS / 4)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = SqlitePlacesStore(os.path.join(tmp_dir, "places.sqlite3"))
+        try:
+            results = run_checks(PlacesCache(store))
+        finally:
+            store.close()
+            server.shutdown()
+            server.server_close()
+
+    for name, ok in results:
+        print(f"{'ok' if ok else 'FAIL':>4}  {name}")
+    if not all(ok for _, ok in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
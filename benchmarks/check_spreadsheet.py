@@ -0,0 +1,220 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import get_spread_sheet
+from get_spread_sheet import (
+    RANGE_NAME_COORDINATE,
+    RANGE_NAME_INDEX,
+    RANGE_NAME_TRIPADVISOR,
+    clear_spreadsheet_manual_data,
+    get_spreadsheet_manual_data,
+)
+
+# リポジトリのルートから python -m benchmarks.check_spreadsheet で実行する
+# Sheets APIにアクセスせずに、手動入力データのスナップショットの鮮度・オフラインモード・
+# 古い場合のbatchGetによる取得・SPREADSHEET_IDが未設定の場合の動作を確かめる
+# （失敗した項目があれば終了コード1で終わる）
+
+RANGES = [RANGE_NAME_COORDINATE, RANGE_NAME_TRIPADVISOR, RANGE_NAME_INDEX]
+SNAPSHOT_MAX_AGE_SECONDS = 60 * 60
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fixture_rows(name: str) -> dict[str, list[list[str]]]:
+    # 1日分の手動入力データ。nameで取得元を見分ける
+    date = "2025年2月16日"
+    return {
+        RANGE_NAME_COORDINATE: [[date, name, "35.6173", "139.5646"]],
+        RANGE_NAME_TRIPADVISOR: [
+            [date, "a", "b", "c", "d", "e", "TRUE", "FALSE", "TRUE", "FALSE", "TRUE"]
+        ],
+        RANGE_NAME_INDEX: [
+            [date, "0.8", "0.9", "0.5", "0.3", "0.4", "0.6", "0.2", "0.5"]
+        ],
+    }
+
+
+def source_name() -> str:
+    # 読み込んだ手動入力データがどこから来たか
+    clear_spreadsheet_manual_data()
+    return (
+        get_spreadsheet_manual_data(
+            offline=False, max_age_seconds=SNAPSHOT_MAX_AGE_SECONDS
+        )
+        .coordinate[0]
+        .name
+    )
+
+
+class FakeSheetsService:
+    # googleapiclient.discovery.buildが返すサービスのうち、batchGetだけを模す
+    def __init__(self, rows: dict[str, list[list[str]]]):
+        self.rows = rows
+        self.calls: list[list[str]] = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def batchGet(self, spreadsheetId: str, ranges: list[str]):
+        self.calls.append(ranges)
+        self._ranges = ranges
+        return self
+
+    def execute(self):
+        return {"valueRanges": [{"values": self.rows[r]} for r in self._ranges]}
+
+
+class FakeCredentials:
+    valid = True
+
+
+def check_unset_spreadsheet_id(tmp_dir: str) -> bool:
+    # SPREADSHEET_IDがなくてもimportはでき、取得しようとしたときにエラーになること
+    env = {
+        k: v
+        for k, v in os.environ.items()
+        if k not in ("SPREADSHEET_ID", "SPREADSHEET_FIXTURE_PATH")
+    }
+    env["PYTHONPATH"] = REPO_DIR
+    code = (
+        "import get_spread_sheet as g\n"
+        "try:\n"
+        "    g.fetch_spreadsheet_values(['coordinate!A2:D'])\n"
+        "except Exception as e:\n"
+        "    print(e)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    return result.returncode == 0 and "SPREADSHEET_ID is not set" in result.stdout
+
+
+def run_checks(tmp_dir: str) -> list[tuple[str, bool]]:
+    results = []
+    results.append(
+        ("import without SPREADSHEET_ID", check_unset_spreadsheet_id(tmp_dir))
+    )
+
+    fetch_calls = []
+    fetch_spreadsheet_values = get_spread_sheet.fetch_spreadsheet_values
+
+    def counting_fetch(ranges: list[str]) -> list[list[list[str]]]:
+        fetch_calls.append(ranges)
+        return fetch_spreadsheet_values(ranges)
+
+    get_spread_sheet.fetch_spreadsheet_values = counting_fetch
+
+    fixture_path = os.path.join(tmp_dir, "fixture.json")
+    with open(fixture_path, "w", encoding="utf-8") as f:
+        json.dump(fixture_rows("fixture"), f, ensure_ascii=False)
+    get_spread_sheet.SPREADSHEET_FIXTURE_PATH = fixture_path
+    results.append(
+        (
+            "fixture stands in for the Sheets API",
+            source_name() == "fixture"
+            and len(fetch_calls) == 1
+            and os.path.exists(get_spread_sheet.SPREADSHEET_SNAPSHOT_PATH),
+        )
+    )
+
+    with open(fixture_path, "w", encoding="utf-8") as f:
+        json.dump(fixture_rows("changed"), f, ensure_ascii=False)
+    results.append(
+        (
+            "fresh snapshot is used without fetching",
+            source_name() == "fixture" and len(fetch_calls) == 1,
+        )
+    )
+
+    # スナップショットを古くし、Sheets APIのbatchGetで取得し直させる
+    with open(get_spread_sheet.SPREADSHEET_SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    snapshot["fetched_at"] -= SNAPSHOT_MAX_AGE_SECONDS * 2
+    with open(get_spread_sheet.SPREADSHEET_SNAPSHOT_PATH, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+
+    from google.oauth2 import credentials
+    from googleapiclient import discovery
+
+    service = FakeSheetsService(fixture_rows("sheets"))
+    from_authorized_user_file = credentials.Credentials.from_authorized_user_file
+    build = discovery.build
+    credentials.Credentials.from_authorized_user_file = staticmethod(
+        lambda *args, **kwargs: FakeCredentials()
+    )
+    discovery.build = lambda *args, **kwargs: service
+    get_spread_sheet.SPREADSHEET_FIXTURE_PATH = None
+    get_spread_sheet.SPREADSHEET_ID = "stub"
+    with open("token.json", "w") as f:
+        f.write("{}")
+    try:
+        name = source_name()
+    finally:
+        credentials.Credentials.from_authorized_user_file = from_authorized_user_file
+        discovery.build = build
+    results.append(
+        (
+            "stale snapshot is fetched again in one batchGet",
+            name == "sheets" and len(fetch_calls) == 2 and service.calls == [RANGES],
+        )
+    )
+
+    # オフラインモードでは、古いスナップショットでも取得せずに使う
+    snapshot["fetched_at"] -= SNAPSHOT_MAX_AGE_SECONDS * 2
+    snapshot["data"]["coordinate"][0]["name"] = "offline"
+    with open(get_spread_sheet.SPREADSHEET_SNAPSHOT_PATH, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    clear_spreadsheet_manual_data()
+    manual_data = get_spreadsheet_manual_data(offline=True)
+    results.append(
+        (
+            "offline mode uses a stale snapshot",
+            manual_data.coordinate[0].name == "offline" and len(fetch_calls) == 2,
+        )
+    )
+
+    os.remove(get_spread_sheet.SPREADSHEET_SNAPSHOT_PATH)
+    clear_spreadsheet_manual_data()
+    try:
+        get_spreadsheet_manual_data(offline=True)
+        raised = False
+    except Exception:
+        raised = True
+    results.append(
+        (
+            "offline mode without a snapshot raises",
+            raised and len(fetch_calls) == 2,
+        )
+    )
+    return results
+
+
+def main():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # スナップショットとtoken.jsonは一時ディレクトリに作る
+        os.chdir(tmp_dir)
+        try:
+            results = run_checks(tmp_dir)
+        finally:
+            os.chdir(cwd)
+            clear_spreadsheet_manual_data()
+
+    for name, ok in results:
+        print(f"{'ok' if ok else 'FAIL':>4}  {name}")
+    if not all(ok for _, ok in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
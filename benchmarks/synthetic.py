@@ -0,0 +1,171 @@
+import json
+import math
+import random
+from datetime import datetime, timedelta
+
+from objective_score import load_predefined_genres_by_google_places_api
+
+# ベンチマーク用に、実データと同じ形式の合成データを作成する
+
+START_TIME = "2025-02-16T09:00:00.000+09:00"
+CENTER_LAT, CENTER_LON = 35.6173, 139.5646
+# 合成データで使う場所IDの種類数
+NUM_PLACE_IDS = 1000
+
+
+def synthetic_place_id(i: int) -> str:
+    return f"ChIJ{i:04d}"
+
+
+def generate_random_walk(num_points: int, seed: int = 0) -> list[tuple[float, float]]:
+    # 拠点駅周辺を歩き回る軌跡を模したランダムウォーク (lat, lon)
+    rng = random.Random(seed)
+    lat, lon = CENTER_LAT, CENTER_LON
+    coordinates = []
+    for _ in range(num_points):
+        lat += rng.gauss(0, 0.0005)
+        lon += rng.gauss(0, 0.0005)
+        coordinates.append((lat, lon))
+    return coordinates
+
+
+def generate_confined_random_walk(
+    num_points: int, radius_degrees: float = 0.009, seed: int = 0
+) -> list[tuple[float, float]]:
+    # 拠点駅から約1km四方の外に出ず、同じ場所を何度も通るランダムウォーク (lat, lon)
+    rng = random.Random(seed)
+    lat, lon = CENTER_LAT, CENTER_LON
+    coordinates = []
+    for _ in range(num_points):
+        lat += rng.gauss(0, 0.0005)
+        lon += rng.gauss(0, 0.0005)
+        # 範囲の外に出た分は、境界で折り返す
+        if abs(lat - CENTER_LAT) > radius_degrees:
+            lat = CENTER_LAT + math.copysign(
+                2 * radius_degrees - abs(lat - CENTER_LAT), lat - CENTER_LAT
+            )
+        if abs(lon - CENTER_LON) > radius_degrees:
+            lon = CENTER_LON + math.copysign(
+                2 * radius_degrees - abs(lon - CENTER_LON), lon - CENTER_LON
+            )
+        coordinates.append((lat, lon))
+    return coordinates
+
+
+def generate_trajectory_with_stays(
+    num_points: int, seed: int = 0
+) -> list[tuple[float, float]]:
+    # 移動の合間に立ち止まる軌跡。滞在中の点は数メートルの誤差でばらつき、同じ座標も続く
+    rng = random.Random(seed)
+    lat, lon = CENTER_LAT, CENTER_LON
+    coordinates = []
+    while len(coordinates) < num_points:
+        if rng.random() < 0.2:
+            for _ in range(rng.randint(5, 20)):
+                coordinates.append(
+                    (lat + rng.gauss(0, 0.00003), lon + rng.gauss(0, 0.00003))
+                )
+                if rng.random() < 0.3:
+                    coordinates.append(coordinates[-1])
+        lat += rng.gauss(0, 0.0005)
+        lon += rng.gauss(0, 0.0005)
+        coordinates.append((lat, lon))
+    return coordinates[:num_points]
+
+
+def generate_synthetic_location_history(num_records: int, seed: int = 0) -> list[dict]:
+    # 移動と訪問が交互に並ぶTimelineのエクスポートを模したレコード
+    rng = random.Random(seed)
+    t = datetime.fromisoformat(START_TIME)
+    lat, lon = CENTER_LAT, CENTER_LON
+    records = []
+    for i in range(num_records):
+        end = t + timedelta(minutes=rng.randint(5, 30))
+        if i % 2 == 0:
+            next_lat, next_lon = lat + rng.gauss(0, 0.002), lon + rng.gauss(0, 0.002)
+            records.append(
+                {
+                    "endTime": end.isoformat(timespec="milliseconds"),
+                    "startTime": t.isoformat(timespec="milliseconds"),
+                    "activity": {
+                        "probability": "0.95",
+                        "end": f"geo:{next_lat:.6f},{next_lon:.6f}",
+                        "topCandidate": {"type": "walking", "probability": "0.8"},
+                        "distanceMeters": f"{rng.uniform(50, 2000):.1f}",
+                        "start": f"geo:{lat:.6f},{lon:.6f}",
+                    },
+                }
+            )
+            lat, lon = next_lat, next_lon
+        else:
+            place_id = synthetic_place_id(rng.randrange(NUM_PLACE_IDS))
+            records.append(
+                {
+                    "endTime": end.isoformat(timespec="milliseconds"),
+                    "startTime": t.isoformat(timespec="milliseconds"),
+                    "visit": {
+                        "hierarchyLevel": "0",
+                        "topCandidate": {
+                            "probability": "0.7",
+                            "semanticType": "Unknown",
+                            "placeID": place_id,
+                            "placeLocation": f"geo:{lat:.6f},{lon:.6f}",
+                        },
+                        "probability": "0.9",
+                    },
+                }
+            )
+        t = end
+    return records
+
+
+def write_synthetic_location_history(
+    filepath: str, num_records: int, seed: int = 0
+) -> None:
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(generate_synthetic_location_history(num_records, seed), f, indent=2)
+
+
+def generate_synthetic_step_count(num_samples: int, seed: int = 0) -> list[dict]:
+    # ヘルスケアから書き出した10秒ごとの歩数を模したデータ
+    # data/extract_step_count.pyの以前の集計と同じく、秒は0埋めしない ("10:00:0")
+    rng = random.Random(seed)
+    t = datetime.fromisoformat(START_TIME).replace(hour=0)
+    steps = []
+    for _ in range(num_samples):
+        date = t.strftime("%Y-%m-%d %H:%M:") + str(t.second) + t.strftime(" %z")
+        steps.append({"date": date, "qty": rng.randint(0, 20)})
+        t += timedelta(seconds=10)
+    return steps
+
+
+def write_synthetic_step_count(filepath: str, num_samples: int, seed: int = 0) -> None:
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(generate_synthetic_step_count(num_samples, seed), f)
+
+
+def generate_synthetic_place_details(
+    place_ids: list[str], seed: int = 0
+) -> dict[str, dict]:
+    # Places APIの応答を模した、場所IDごとの詳細（事前定義されたジャンルから選ぶ）
+    rng = random.Random(seed)
+    all_genres = sorted(
+        {
+            genre
+            for genres in load_predefined_genres_by_google_places_api().values()
+            for genre in genres
+        }
+    )
+    place_details = {}
+    for place_id in place_ids:
+        types = rng.sample(all_genres, rng.randint(1, 4))
+        place_details[place_id] = {
+            "name": f"places/{place_id}",
+            "id": place_id,
+            "types": types,
+            "formattedAddress": "日本、東京都",
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "displayName": {"text": place_id, "languageCode": "ja"},
+            "primaryType": types[0],
+        }
+    return place_details
@@ -0,0 +1,104 @@
+from typing import Iterable
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Point
+from shapely.geometry.base import BaseGeometry
+
+from geo_area_calculator import (
+    WGS84,
+    aea_crs,
+    aeqd_crs,
+    get_transformer,
+)
+
+
+class PreparedCoverage:
+    # 1日の総移動範囲を準備しておき、(中心, 半径)の組ごとの網羅率をまとめて求める
+    # calculate_coverage_ratioと同じ計算を、図形の分割・索引・投影を使い回して行う
+    def __init__(self, total_polygon: BaseGeometry):
+        # 総移動範囲を連結した部分ごとに分け、円と重なる部分だけを索引で探せるようにする
+        self.parts = shapely.get_parts(total_polygon)
+        self.tree = STRtree(self.parts)
+        # 正積図法なので標準緯線は面積に影響しない。1日分を1つの投影にまとめる
+        self.crs = None
+        self.part_areas = np.zeros(0)
+        if not total_polygon.is_empty:
+            _, min_lat, _, max_lat = total_polygon.bounds
+            self.crs = aea_crs(min_lat, max_lat)
+            self.part_areas = self._projected_areas(self.parts)
+
+    def _projected_areas(self, geometries: np.ndarray) -> np.ndarray:
+        transformer = get_transformer(WGS84, self.crs)
+        projected = shapely.transform(
+            geometries,
+            lambda coords: np.column_stack(
+                transformer.transform(coords[:, 0], coords[:, 1])
+            ),
+        )
+        return shapely.area(projected)
+
+    def _circles(
+        self, center_lat: float, center_lon: float, radii: np.ndarray
+    ) -> np.ndarray:
+        # geodesic_point_bufferと同じ円を、同じ中心の半径の分だけまとめて作る
+        transformer = get_transformer(aeqd_crs(center_lat, center_lon), WGS84)
+        return shapely.transform(
+            shapely.buffer(Point(0, 0), radii, quad_segs=16),
+            lambda coords: np.column_stack(
+                transformer.transform(coords[:, 0], coords[:, 1])
+            ),
+        )
+
+    def _covered_ratio(self, circle: BaseGeometry, circle_area: float) -> float:
+        shapely.prepare(circle)
+        candidates = self.tree.query(circle, predicate="intersects")
+        if len(candidates) == 0:
+            return 0.0
+        # 円に完全に含まれる部分は、準備しておいた面積をそのまま足す
+        inside = shapely.contains_properly(circle, self.parts[candidates])
+        covered_area = self.part_areas[candidates[inside]].sum()
+        crossing = self.parts[candidates[~inside]]
+        if len(crossing) > 0:
+            # 先に円の外接矩形で切り取ると、交差の計算が円の付近だけで済む
+            try:
+                clipped = shapely.clip_by_rect(crossing, *circle.bounds)
+                pieces = shapely.intersection(clipped, circle)
+            except shapely.errors.GEOSException:
+                pieces = shapely.intersection(crossing, circle)
+            covered_area += self._projected_areas(pieces).sum()
+        return float(covered_area / circle_area)
+
+    def ratios(self, queries: Iterable[tuple[float, float, float]]) -> np.ndarray:
+        # queriesは(中心の緯度, 中心の経度, 半径)の組の並び
+        # 中心が同じ問い合わせは、円の作成と投影を1回にまとめる
+        queries = list(queries)
+        ratios = np.zeros(len(queries), dtype=np.float64)
+        if self.crs is None:
+            return ratios
+        indices_by_center: dict[tuple[float, float], list[int]] = {}
+        for i, (center_lat, center_lon, _) in enumerate(queries):
+            indices_by_center.setdefault((center_lat, center_lon), []).append(i)
+        for (center_lat, center_lon), indices in indices_by_center.items():
+            radii = np.array([queries[i][2] for i in indices], dtype=np.float64)
+            circles = self._circles(center_lat, center_lon, radii)
+            circle_areas = self._projected_areas(circles)
+            for i, circle, circle_area in zip(indices, circles, circle_areas):
+                ratios[i] = self._covered_ratio(circle, circle_area)
+        return ratios
+
+    def ratio(
+        self, center_lat: float, center_lon: float, radius_meters: float
+    ) -> float:
+        return float(self.ratios([(center_lat, center_lon, radius_meters)])[0])
+
+    def ratio_grid(
+        self, centers: list[tuple[float, float]], radii: list[float]
+    ) -> np.ndarray:
+        # 中心と半径の全ての組み合わせの網羅率を、(中心の数, 半径の数) の配列で返す
+        return self.ratios(
+            (center_lat, center_lon, radius_meters)
+            for center_lat, center_lon in centers
+            for radius_meters in radii
+        ).reshape(len(centers), len(radii))
@@ -1,34 +1,49 @@
 import json
 import datetime
 
+from json_stream import iter_json_array
 
-def extract_data_by_date(input_file, target_date):
-    with open(input_file, "r") as f:
-        data = json.load(f)
 
-    extracted_data = []
-    for item in data:
+def date_range(start_date: str, end_date: str) -> list[str]:
+    # start_dateからend_dateまで(両端を含む)の日付を"YYYY-MM-DD"形式で返す
+    start = datetime.date.fromisoformat(start_date)
+    end = datetime.date.fromisoformat(end_date)
+    return [
+        (start + datetime.timedelta(days=i)).isoformat()
+        for i in range((end - start).days + 1)
+    ]
+
+
+def split_data_by_dates(input_file: str, target_dates: list[str]) -> dict[str, str]:
+    # エクスポートを1回だけ走査し、対象日ごとのファイルに分割する
+    extracted_data: dict[str, list[dict]] = {date: [] for date in target_dates}
+    for item in iter_json_array(input_file):
         try:
-            # startTimeをdatetimeオブジェクトに変換
-            start_time_str = item["startTime"]
-            start_time_dt = datetime.datetime.strptime(
-                start_time_str, "%Y-%m-%dT%H:%M:%S.%f%z"
-            )
-
-            # 日付部分を比較
-            if start_time_dt.strftime("%Y-%m-%d") == target_date:
-                extracted_data.append(item)
-        except (KeyError, ValueError):
+            # startTimeは"YYYY-MM-DDThh:mm:ss.fff+09:00"形式なので、先頭10文字が現地の日付
+            start_date = item["startTime"][:10]
+        except (KeyError, TypeError):
             print("Error: Invalid data format in one of the items.")
             continue
+        if start_date in extracted_data:
+            extracted_data[start_date].append(item)
+
+    # 走査が終わってからまとめて書き出す
+    output_files: dict[str, str] = {}
+    for target_date, items in extracted_data.items():
+        output_file = f"{input_file[:-5]}_{target_date}.json"
+        with open(output_file, "w") as f:
+            json.dump(items, f, indent=2, ensure_ascii=False)
+        output_files[target_date] = output_file
+        print(f"Data for {target_date} extracted to '{output_file}'")
+    return output_files
+
 
-    output_file = f"{input_file[:-5]}_{target_date}.json"
-    with open(output_file, "w") as f:
-        json.dump(extracted_data, f, indent=2, ensure_ascii=False)
-    print(f"Data for {target_date} extracted to '{output_file}'")
+def extract_data_by_date(input_file: str, target_date: str) -> str:
+    return split_data_by_dates(input_file, [target_date])[target_date]
 
 
 if __name__ == "__main__":
-    target_date_str = "2025-02-16"
-    input_json_file = f"location-history.json"
-    extract_data_by_date(input_json_file, target_date_str)
+    # リポジトリのルートから python -m data.extract_location_history_by_date で実行する
+    target_dates = ["2025-01-24", "2025-02-16"]
+    input_json_file = "data/location-history.json"
+    split_data_by_dates(input_json_file, target_dates)
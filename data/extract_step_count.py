@@ -1,54 +1,72 @@
-import json
-from datetime import datetime, timedelta
-
-
-def convert_to_10seconds(data):
-    new_data = []
-    current_10sec_data = {}
-
-    for step in data["data"]["metrics"][0]["data"]:
-        # dateをdatetimeオブジェクトに変換 (秒まで)
-        date_obj = datetime.strptime(
-            step["date"][:-6], "%Y-%m-%d %H:%M:%S"
-        )  # タイムゾーン情報を削除してparse
-
-        # 10秒単位のキーを生成 (例: "2025-01-14 06:15:20")
-        ten_sec_key = date_obj.strftime("%Y-%m-%d %H:%M:") + str(
-            date_obj.second // 10 * 10
-        )
-
-        if not current_10sec_data:
-            current_10sec_data = {
-                "date": ten_sec_key + " +0900",
-                "qty": step["qty"],
-            }
-        elif ten_sec_key == current_10sec_data["date"][:-6]:
-            current_10sec_data["qty"] += step["qty"]
-        else:
-            new_data.append(current_10sec_data)
-            current_10sec_data = {
-                "date": ten_sec_key + " +0900",
-                "qty": step["qty"],
-            }
+import numpy as np
+
+from json_stream import iter_json_array
+from step_count_store import StepCountSeries, parse_step_datetime_array
+
+BATCH_SIZE = 100000
+
+
+def _reduce_buckets(
+    buckets: np.ndarray, qty: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    # 同じバケットの歩数を合計し、バケットの昇順に並べる
+    unique_buckets, inverse = np.unique(buckets, return_inverse=True)
+    return unique_buckets, np.bincount(inverse, weights=qty).astype(np.float32)
 
-    # 最後のデータを追加
-    if current_10sec_data:
-        new_data.append(current_10sec_data)
-    return new_data
+
+def aggregate_step_count(
+    input_file: str,
+    bucket_seconds_list: list[int],
+    batch_size: int = BATCH_SIZE,
+) -> dict[int, StepCountSeries]:
+    # Health Auto Exportの歩数データを1回だけ走査し、指定した全ての秒数単位で集計する
+    partial_buckets: dict[int, list[np.ndarray]] = {b: [] for b in bucket_seconds_list}
+    partial_qty: dict[int, list[np.ndarray]] = {b: [] for b in bucket_seconds_list}
+
+    def _flush(dates: list[str], qtys: list[float]) -> None:
+        # バッチ単位で時刻を整数に変換し、整数の割り算でバケットに振り分ける
+        epoch = parse_step_datetime_array(dates)
+        qty = np.array(qtys, dtype=np.float64)
+        for bucket_seconds in bucket_seconds_list:
+            buckets, sums = _reduce_buckets(
+                epoch // bucket_seconds * bucket_seconds, qty
+            )
+            partial_buckets[bucket_seconds].append(buckets)
+            partial_qty[bucket_seconds].append(sums)
+
+    dates: list[str] = []
+    qtys: list[float] = []
+    for step in iter_json_array(input_file, skip_to=('"metrics"', '"data"')):
+        dates.append(step["date"])
+        qtys.append(step["qty"])
+        if len(dates) >= batch_size:
+            _flush(dates, qtys)
+            dates, qtys = [], []
+    if dates:
+        _flush(dates, qtys)
+
+    # バッチの境界をまたぐバケットをまとめる
+    series: dict[int, StepCountSeries] = {}
+    for bucket_seconds in bucket_seconds_list:
+        if partial_buckets[bucket_seconds]:
+            buckets, sums = _reduce_buckets(
+                np.concatenate(partial_buckets[bucket_seconds]),
+                np.concatenate(partial_qty[bucket_seconds]),
+            )
+        else:
+            buckets = np.empty(0, dtype=np.int64)
+            sums = np.empty(0, dtype=np.float32)
+        series[bucket_seconds] = StepCountSeries(buckets, sums)
+    return series
 
 
 if __name__ == "__main__":
-    with open("StepCount.json", "r") as f:
-        data = json.load(f)
-    # "source"キーを削除
-    for i, steps in enumerate(data["data"]["metrics"][0]["data"]):
-        new_step = {
-            "date": steps["date"],
-            "qty": steps["qty"],
-        }
-        data["data"]["metrics"][0]["data"][i] = new_step
-    # 10秒単位に変換
-    converted_data = convert_to_10seconds(data)
-
-    with open("StepCount_10sec.json", "w") as f:
-        json.dump(converted_data, f, indent=4)
+    # リポジトリのルートから python -m data.extract_step_count で実行する
+    # 10秒・1分・1時間単位に集計し、data/StepCount_{秒数}sec.{epoch,qty}.npyに保存する
+    input_json_file = "data/StepCount.json"
+    for seconds, step_count_series in aggregate_step_count(
+        input_json_file, [10, 60, 3600]
+    ).items():
+        output_prefix = f"data/StepCount_{seconds}sec"
+        step_count_series.save(output_prefix)
+        print(f"{len(step_count_series)} buckets saved to '{output_prefix}.*.npy'")
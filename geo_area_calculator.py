@@ -1,24 +1,70 @@
 import math
+import numpy as np
 import pyproj
-from functools import partial
+import shapely
+from functools import lru_cache
 from shapely.geometry import LineString, Point, Polygon
-from shapely.ops import transform
+from shapely.geometry.base import BaseGeometry
+
+from instrumentation import span
 
 # 地球の半径（メートル）
 R: float = 6378137
+# calculate_total_polygonで1つのLineStringにまとめる点の数
+TOTAL_AREA_CHUNK_POINTS = 32
+
+WGS84 = "EPSG:4326"
+TRANSFORMER_CACHE_SIZE = 128
+# 正積図法の標準緯線を丸める桁数（正積図法なので標準緯線は面積に影響せず、丸めてキャッシュを共有する）
+AEA_LATITUDE_DIGITS = 2
+# calculate_coverage_ratio_rasterの格子の1マスの大きさ（メートル）
+DEFAULT_RASTER_CELL_METERS = 5.0
+
+
+@lru_cache(maxsize=TRANSFORMER_CACHE_SIZE)
+def get_transformer(crs_from: str, crs_to: str) -> pyproj.Transformer:
+    # 投影法の組み合わせごとにTransformerを作成し、使い回す
+    return pyproj.Transformer.from_crs(crs_from, crs_to, always_xy=True)
+
+
+def transform_geometry(
+    geometry: BaseGeometry, crs_from: str, crs_to: str
+) -> BaseGeometry:
+    # ジオメトリの全座標をNumPy配列として一度に変換する
+    transformer = get_transformer(crs_from, crs_to)
+    return shapely.transform(
+        geometry,
+        lambda coords: np.column_stack(
+            transformer.transform(coords[:, 0], coords[:, 1])
+        ),
+    )
+
+
+def aeqd_crs(lat: float, lon: float) -> str:
+    # 指定した点を中心とする正距方位図法
+    return f"+proj=aeqd +lat_0={lat} +lon_0={lon} +x_0=0 +y_0=0"
+
+
+def aea_crs(lat_1: float, lat_2: float) -> str:
+    # 2本の標準緯線を持つアルベルス正積円錐図法
+    lat_1 = round(lat_1, AEA_LATITUDE_DIGITS)
+    lat_2 = round(lat_2, AEA_LATITUDE_DIGITS)
+    return f"+proj=aea +lat_1={lat_1} +lat_2={lat_2}"
+
+
+def calculate_projected_area(geometry: BaseGeometry) -> float:
+    # 緯度経度のジオメトリを正積図法に投影して面積（平方メートル）を計算
+    if geometry.is_empty:
+        return 0.0
+    _, min_lat, _, max_lat = geometry.bounds
+    return transform_geometry(geometry, WGS84, aea_crs(min_lat, max_lat)).area
 
 
 def geodesic_point_buffer(lat: float, lon: float, meters: float) -> Polygon:
     # 球面座標系の点を中心とする円を作成
-    aeqd_proj = f"+proj=aeqd +lat_0={lat} +lon_0={lon} +x_0=0 +y_0=0"
-    project = partial(
-        pyproj.transform,
-        pyproj.Proj(aeqd_proj),
-        pyproj.Proj("+proj=longlat +datum=WGS84"),
-    )
     point = Point(0, 0)
     circle = point.buffer(meters)
-    return transform(project, circle)
+    return transform_geometry(circle, aeqd_crs(lat, lon), WGS84)
 
 
 def calculate_area_moved(
@@ -30,22 +76,34 @@ def calculate_area_moved(
     return buffer_poly
 
 
+def calculate_total_polygon(
+    coordinates: list[tuple[float, float]] | np.ndarray, buffer_meters: float
+) -> Polygon:
+    # 軌跡を短いLineStringに分割してまとめてバッファし、カスケード方式で一度に和集合をとる
+    # 区間ごとのバッファを逐次unionした結果との面積の相対誤差は0.1%未満
+    # (円弧の近似の違いによるもので、benchmarks/bench_total_area.pyで確認できる)
+    if len(coordinates) < 2:
+        return Polygon()
+    lonlat = np.asarray(coordinates, dtype=float)[:, ::-1]
+    chunks = [
+        LineString(lonlat[i : i + TOTAL_AREA_CHUNK_POINTS + 1])
+        for i in range(0, len(lonlat) - 1, TOTAL_AREA_CHUNK_POINTS)
+    ]
+    buffers = shapely.buffer(
+        chunks, buffer_meters / R * 180 / math.pi, quad_segs=16, cap_style="round"
+    )
+    return shapely.union_all(buffers)
+
+
 def calculate_total_area(
-    coordinates: list[tuple[float, float]], buffer_meters: float
+    coordinates: list[tuple[float, float]] | np.ndarray, buffer_meters: float
 ) -> tuple[float, Polygon]:
     # 軌跡の総移動面積を計算
-    total_poly = Polygon()
-    for i in range(len(coordinates) - 1):
-        lat1, lon1 = coordinates[i]
-        lat2, lon2 = coordinates[i + 1]
-        line_poly = calculate_area_moved(lat1, lon1, lat2, lon2, buffer_meters)
-        total_poly = total_poly.union(line_poly)
-    proj = pyproj.Proj(
-        proj="aea", lat_1=total_poly.bounds[1], lat_2=total_poly.bounds[3]
-    )
-    wgs84 = pyproj.Proj(init="epsg:4326")
-    projected_poly = transform(partial(pyproj.transform, wgs84, proj), total_poly)
-    return projected_poly.area, total_poly
+    with span("calculate_total_polygon"):
+        total_poly = calculate_total_polygon(coordinates, buffer_meters)
+    with span("calculate_projected_area"):
+        total_area = calculate_projected_area(total_poly)
+    return total_area, total_poly
 
 
 def calculate_coverage_ratio(
@@ -57,19 +115,127 @@ def calculate_coverage_ratio(
     # 観光範囲円と総移動面積の交差部分の面積の比を計算
     circle_poly = geodesic_point_buffer(center_lat, center_lon, radius_meters)
     intersection_poly = total_area_polygon.intersection(circle_poly)
-    proj = pyproj.Proj(
-        proj="aea",
-        lat_1=intersection_poly.bounds[1],
-        lat_2=intersection_poly.bounds[3],
-    )
-    wgs84 = pyproj.Proj(init="epsg:4326")
-    intersection_area = transform(
-        partial(pyproj.transform, wgs84, proj), intersection_poly
-    ).area
-    circle_area = transform(partial(pyproj.transform, wgs84, proj), circle_poly).area
+    intersection_area = calculate_projected_area(intersection_poly)
+    circle_area = calculate_projected_area(circle_poly)
     return intersection_area / circle_area
 
 
+def _clip_segments(
+    x0: np.ndarray,
+    y0: np.ndarray,
+    x1: np.ndarray,
+    y1: np.ndarray,
+    half_width: float,
+    half_height: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # 線分を原点中心の矩形で切り取る（Liang-Barsky法）。矩形にかからない線分は除く
+    dx, dy = x1 - x0, y1 - y0
+    t0 = np.zeros(len(x0))
+    t1 = np.ones(len(x0))
+    inside = np.ones(len(x0), dtype=bool)
+    for p, q in (
+        (-dx, x0 + half_width),
+        (dx, half_width - x0),
+        (-dy, y0 + half_height),
+        (dy, half_height - y0),
+    ):
+        parallel = p == 0
+        inside &= ~(parallel & (q < 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = q / p
+        t0 = np.where(~parallel & (p < 0), np.maximum(t0, r), t0)
+        t1 = np.where(~parallel & (p > 0), np.minimum(t1, r), t1)
+    inside &= t0 <= t1
+    t0, t1 = t0[inside], t1[inside]
+    x0, y0, dx, dy = x0[inside], y0[inside], dx[inside], dy[inside]
+    return x0 + t0 * dx, y0 + t0 * dy, x0 + t1 * dx, y0 + t1 * dy
+
+
+def rasterize_path(
+    x: np.ndarray,
+    y: np.ndarray,
+    num_cols: int,
+    num_rows: int,
+    cell_meters: float,
+    buffer_x: float,
+    buffer_y: float,
+) -> np.ndarray:
+    # 原点を中心とする num_rows x num_cols の格子に、軌跡の周囲を塗った真偽値の配列を作る
+    # 軌跡を1/2マス以下の間隔で点に分けて中心線を塗り、楕円形の近傍で膨らませる
+    margin_x = math.ceil(buffer_x / cell_meters)
+    margin_y = math.ceil(buffer_y / cell_meters)
+    cols, rows = num_cols + 2 * margin_x, num_rows + 2 * margin_y
+    half_width, half_height = cols * cell_meters / 2, rows * cell_meters / 2
+
+    centerline = np.zeros((rows, cols), dtype=np.float64)
+    if len(x) >= 2:
+        x0, y0, x1, y1 = _clip_segments(
+            x[:-1], y[:-1], x[1:], y[1:], half_width, half_height
+        )
+        lengths = np.hypot(x1 - x0, y1 - y0)
+        counts = np.ceil(lengths / (cell_meters / 2)).astype(np.int64) + 1
+        segment = np.repeat(np.arange(len(counts)), counts)
+        starts = np.cumsum(counts) - counts
+        t = (np.arange(counts.sum()) - starts[segment]) / np.maximum(
+            counts[segment] - 1, 1
+        )
+        px = x0[segment] + t * (x1 - x0)[segment]
+        py = y0[segment] + t * (y1 - y0)[segment]
+        ix = np.clip(((px + half_width) / cell_meters).astype(np.int64), 0, cols - 1)
+        iy = np.clip(((py + half_height) / cell_meters).astype(np.int64), 0, rows - 1)
+        centerline[iy, ix] = 1.0
+    elif len(x) == 1:
+        return np.zeros((num_rows, num_cols), dtype=bool)
+
+    # 中心がバッファの楕円に入るマスを近傍とし、FFTによる畳み込みで膨らませる
+    ky, kx = np.mgrid[-margin_y : margin_y + 1, -margin_x : margin_x + 1]
+    kernel = (
+        (kx * cell_meters / buffer_x) ** 2 + (ky * cell_meters / buffer_y) ** 2 <= 1
+    ).astype(np.float64)
+    shape = (rows + kernel.shape[0] - 1, cols + kernel.shape[1] - 1)
+    dilated = np.fft.irfft2(
+        np.fft.rfft2(centerline, shape) * np.fft.rfft2(kernel, shape), shape
+    )
+    # 外周の余白の分を除き、元の格子の範囲だけを返す
+    return (
+        dilated[
+            2 * margin_y : 2 * margin_y + num_rows,
+            2 * margin_x : 2 * margin_x + num_cols,
+        ]
+        > 0.5
+    )
+
+
+def calculate_coverage_ratio_raster(
+    center_lat: float,
+    center_lon: float,
+    radius_meters: float,
+    coordinates: list[tuple[float, float]] | np.ndarray,
+    buffer_meters: float,
+    cell_meters: float = DEFAULT_RASTER_CELL_METERS,
+) -> float:
+    # calculate_total_polygonとcalculate_coverage_ratioの近似版
+    # 拠点を中心とする正距方位図法の格子に軌跡を塗り、円内で塗られたマスの割合を返す
+    # 誤差はマスの大きさに依存する（benchmarks/bench_coverage_raster.pyで確認できる）
+    if len(coordinates) == 0:
+        return 0.0
+    latlon = np.asarray(coordinates, dtype=float)
+    transformer = get_transformer(WGS84, aeqd_crs(center_lat, center_lon))
+    x, y = transformer.transform(latlon[:, 1], latlon[:, 0])
+
+    # calculate_total_polygonは経緯度のままバッファするため、東西方向の幅は緯度に応じて狭くなる
+    buffer_y = buffer_meters
+    buffer_x = buffer_meters * math.cos(math.radians(center_lat))
+
+    n = math.ceil(radius_meters / cell_meters)
+    covered = rasterize_path(
+        np.asarray(x), np.asarray(y), 2 * n, 2 * n, cell_meters, buffer_x, buffer_y
+    )
+    centers = (np.arange(2 * n) - n + 0.5) * cell_meters
+    circle = centers[:, None] ** 2 + centers[None, :] ** 2 <= radius_meters**2
+    return float(np.count_nonzero(covered & circle) / np.count_nonzero(circle))
+
+
 def main():
     # 座標のリスト
     coordinates: list[tuple[float, float]] = [
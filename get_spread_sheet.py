@@ -1,27 +1,54 @@
+import json
 import os.path
+import time
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from models.SpreadsheetManualData import SpreadsheetManualData
 
 from dotenv import load_dotenv
 
 load_dotenv()
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-SPREADSHEET_ID = os.environ["SPREADSHEET_ID"]
+SPREADSHEET_ID = os.environ.get("SPREADSHEET_ID")
 RANGE_NAME_COORDINATE = "coordinate!A2:D"
 RANGE_NAME_TRIPADVISOR = "tripadvisor!A2:K"
 RANGE_NAME_INDEX = "index!A2:J"
 SPREADSHEET_CREDENTIAL_PATH = os.getenv("SPREADSHEET_CREDENTIAL_PATH")
+# 取得したデータをディスクに保存し、次回以降の実行で使い回す
+SPREADSHEET_SNAPSHOT_PATH = os.getenv(
+    "SPREADSHEET_SNAPSHOT_PATH", "spreadsheet_snapshot.json"
+)
+# スナップショットがこの秒数より古い場合は取得し直す
+SPREADSHEET_SNAPSHOT_MAX_AGE_SECONDS = float(
+    os.getenv("SPREADSHEET_SNAPSHOT_MAX_AGE_SECONDS", 24 * 60 * 60)
+)
+# オフラインモードではSheets APIにアクセスせず、古さに関わらずスナップショットを使う
+SPREADSHEET_OFFLINE = os.getenv("SPREADSHEET_OFFLINE", "") not in ("", "0", "false")
+# 指定すると、Sheets APIの代わりにこのJSONファイルの値を返す（ネットワークなしで実行・確認する）
+# 形式は {"coordinate!A2:D": [[...], ...], "tripadvisor!A2:K": ..., "index!A2:J": ...}
+SPREADSHEET_FIXTURE_PATH = os.getenv("SPREADSHEET_FIXTURE_PATH")
 SPREADSHEET_MANUAL_DATA = None
 
 
-def get_spreadsheet_manual_data() -> SpreadsheetManualData:
-    global SPREADSHEET_MANUAL_DATA
-    if SPREADSHEET_MANUAL_DATA is not None:
-        return SPREADSHEET_MANUAL_DATA
+def load_spreadsheet_fixture(path: str, ranges: list[str]) -> list[list[list[str]]]:
+    # fetch_spreadsheet_valuesと同じく、範囲ごとの行のリストを返す（ない範囲は空）
+    with open(path, "r", encoding="utf-8") as f:
+        fixture = json.load(f)
+    return [fixture.get(range_name, []) for range_name in ranges]
+
+
+def fetch_spreadsheet_values(ranges: list[str]) -> list[list[list[str]]]:
+    if SPREADSHEET_FIXTURE_PATH:
+        return load_spreadsheet_fixture(SPREADSHEET_FIXTURE_PATH, ranges)
+
+    # Google関連のライブラリは読み込みが重いため、実際に取得するときだけimportする
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+
+    if SPREADSHEET_ID is None or SPREADSHEET_ID == "":
+        raise Exception("Error: SPREADSHEET_ID is not set")
+
     creds = None
     if os.path.exists("token.json"):
         creds = Credentials.from_authorized_user_file("token.json", SCOPES)
@@ -38,25 +65,31 @@ def get_spreadsheet_manual_data() -> SpreadsheetManualData:
 
     service = build("sheets", "v4", credentials=creds)
     sheet = service.spreadsheets()
+    # 全ての範囲を1回のリクエストで取得する
+    value_ranges = (
+        sheet.values()
+        .batchGet(spreadsheetId=SPREADSHEET_ID, ranges=ranges)
+        .execute()["valueRanges"]
+    )
+    return [value_range.get("values", []) for value_range in value_ranges]
+
+
+def parse_spreadsheet_values(
+    coordinate_rows: list[list[str]],
+    tripadvisor_rows: list[list[str]],
+    index_rows: list[list[str]],
+) -> SpreadsheetManualData:
     coordinate_list = [
         SpreadsheetManualData.Coordinate(
             date=row[0], name=row[1], latitude=float(row[2]), longitude=float(row[3])
         )
-        for row in (
-            sheet.values()
-            .get(spreadsheetId=SPREADSHEET_ID, range=RANGE_NAME_COORDINATE)
-            .execute()["values"]
-        )
+        for row in coordinate_rows
     ]
     tripadvisor_list = [
         SpreadsheetManualData.TripAdvisorRank(
             date=row[0], spot=[(row[i], row[i + 5]) for i in range(1, 6)]
         )
-        for row in (
-            sheet.values()
-            .get(spreadsheetId=SPREADSHEET_ID, range=RANGE_NAME_TRIPADVISOR)
-            .execute()["values"]
-        )
+        for row in tripadvisor_rows
     ]
     index_PDCA = [
         SpreadsheetManualData.IndexPDCA(
@@ -70,20 +103,80 @@ def get_spreadsheet_manual_data() -> SpreadsheetManualData:
             coherence=row[7],
             efficiency=row[8],
         )
-        for row in (
-            sheet.values()
-            .get(spreadsheetId=SPREADSHEET_ID, range=RANGE_NAME_INDEX)
-            .execute()["values"]
-        )
+        for row in index_rows
     ]
-    SPREADSHEET_MANUAL_DATA = SpreadsheetManualData(
+    return SpreadsheetManualData(
         coordinate=coordinate_list,
         tripadvisor_rank=tripadvisor_list,
         index_PDCA=index_PDCA,
     )
+
+
+def save_spreadsheet_snapshot(
+    manual_data: SpreadsheetManualData, path: str = SPREADSHEET_SNAPSHOT_PATH
+) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"fetched_at": time.time(), "data": manual_data.model_dump(mode="json")},
+            f,
+            ensure_ascii=False,
+        )
+
+
+def load_spreadsheet_snapshot(
+    path: str = SPREADSHEET_SNAPSHOT_PATH, max_age_seconds: float | None = None
+) -> SpreadsheetManualData | None:
+    # スナップショットがないか、max_age_secondsより古ければNoneを返す
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    age_seconds = time.time() - snapshot["fetched_at"]
+    if max_age_seconds is not None and age_seconds > max_age_seconds:
+        return None
+    return SpreadsheetManualData.model_validate(snapshot["data"])
+
+
+def get_spreadsheet_manual_data(
+    offline: bool = SPREADSHEET_OFFLINE,
+    max_age_seconds: float = SPREADSHEET_SNAPSHOT_MAX_AGE_SECONDS,
+) -> SpreadsheetManualData:
+    global SPREADSHEET_MANUAL_DATA
+    if SPREADSHEET_MANUAL_DATA is not None:
+        return SPREADSHEET_MANUAL_DATA
+
+    # 新しいスナップショットがあれば、Sheets APIにアクセスせずに使う
+    manual_data = load_spreadsheet_snapshot(
+        max_age_seconds=None if offline else max_age_seconds
+    )
+    if manual_data is None:
+        if offline:
+            raise Exception(
+                f"Error: snapshot '{SPREADSHEET_SNAPSHOT_PATH}' not found in offline mode"
+            )
+        manual_data = parse_spreadsheet_values(
+            *fetch_spreadsheet_values(
+                [RANGE_NAME_COORDINATE, RANGE_NAME_TRIPADVISOR, RANGE_NAME_INDEX]
+            )
+        )
+        save_spreadsheet_snapshot(manual_data)
+
+    SPREADSHEET_MANUAL_DATA = manual_data
     return SPREADSHEET_MANUAL_DATA
 
 
+def set_spreadsheet_manual_data(manual_data: SpreadsheetManualData) -> None:
+    # 親プロセスで取得したデータを、子プロセスでそのまま使う
+    global SPREADSHEET_MANUAL_DATA
+    SPREADSHEET_MANUAL_DATA = manual_data
+
+
+def clear_spreadsheet_manual_data() -> None:
+    # 次回のget_spreadsheet_manual_dataで、スナップショットかSheets APIから読み直す
+    global SPREADSHEET_MANUAL_DATA
+    SPREADSHEET_MANUAL_DATA = None
+
+
 def transform_to_manual_date(date: str) -> str:
     y, m, d = date.split("-")
     return f"{y}年{int(m)}月{int(d)}日"
@@ -91,28 +184,22 @@ def transform_to_manual_date(date: str) -> str:
 
 def get_latitude_longitude_from_spreadsheet(date: str) -> tuple[float, float]:
     manual_data = get_spreadsheet_manual_data()
-    manual_date = transform_to_manual_date(date)
-    for coordinate in manual_data.coordinate:
-        if coordinate.date == manual_date:
-            return coordinate.latitude, coordinate.longitude
-    raise ValueError(f"Data not found for {date}")
+    coordinate = manual_data.get_coordinate(date)
+    if coordinate is None:
+        raise ValueError(f"Data not found for {date}")
+    return coordinate.latitude, coordinate.longitude
 
 
 def get_manual_data_for_importance_score(date: str) -> list[tuple[str, bool]]:
     manual_data = get_spreadsheet_manual_data()
-    manual_date = transform_to_manual_date(date)
-    for tripadvisor in manual_data.tripadvisor_rank:
-        if tripadvisor.date == manual_date:
-            return tripadvisor.spot
-    raise ValueError(f"Data not found for {date}")
+    tripadvisor = manual_data.get_tripadvisor_rank(date)
+    if tripadvisor is None:
+        raise ValueError(f"Data not found for {date}")
+    return tripadvisor.spot
 
 
 def get_index_for_plot_data() -> tuple[dict[str, list[float]], list[str]]:
     manual_data = get_spreadsheet_manual_data()
-    # IndexPDCAの日付と一致するCoordinateのnameをラベルとする
-    date_to_region = {}
-    for coordinate in manual_data.coordinate:
-        date_to_region[coordinate.date] = coordinate.name
 
     index_labels = [
         "満足度",
@@ -127,7 +214,8 @@ def get_index_for_plot_data() -> tuple[dict[str, list[float]], list[str]]:
 
     index_data = {}
     for index in manual_data.index_PDCA:
-        label = date_to_region[index.date]
+        # IndexPDCAの日付と一致するCoordinateのnameをラベルとする
+        label = manual_data.get_coordinate(index.date).name
         index_data[label] = [
             index.satisfaction,
             index.recommendation,
@@ -0,0 +1,260 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+import requests
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+
+from models.GooglePlaceDetail import GooglePlaceDetail
+from models.LocationHistory import LocationHistory
+from instrumentation import span
+from places_cache import PlacesCache, get_places_cache
+
+load_dotenv()
+
+# Google Maps APIキーの環境変数読み込み
+GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY")
+# スタブサーバーで試験する場合は環境変数で接続先を差し替える
+GOOGLE_PLACES_API_URL = os.environ.get(
+    "GOOGLE_PLACES_API_URL", "https://places.googleapis.com/v1/places"
+)
+# このステータスが返ったplaceIDは存在しないものとして記録し、再リクエストしない
+NEGATIVE_CACHE_STATUS_CODES = (400, 404)
+
+GET_FIELDS_LIST = [
+    "name",
+    "id",
+    "types",
+    "formattedAddress",
+    "rating",
+    "displayName",
+    "primaryType",
+]
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_REQUESTS_PER_SECOND = 10.0
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 1.0
+# 接続と応答の待ち時間の上限（秒）。止まった接続でスレッドが待ち続けないようにする
+REQUEST_TIMEOUT_SECONDS = (5.0, 10.0)
+
+
+class RateLimiter:
+    # 複数スレッドから呼ばれても、リクエストの間隔が1/max_per_second秒以上空くようにする
+    def __init__(self, max_per_second: float):
+        self.interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait_until = max(self._next_time, now)
+            self._next_time = wait_until + self.interval
+        if wait_until > now:
+            time.sleep(wait_until - now)
+
+
+def create_session(pool_size: int = DEFAULT_MAX_WORKERS) -> requests.Session:
+    # keep-aliveで接続を再利用するセッションを作成
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# 接続プールの大きさごとのセッション。並行数よりプールが小さいと、あふれた接続が
+# 捨てられてkeep-aliveで再利用されなくなる
+_SESSIONS: dict[int, requests.Session] = {}
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session(pool_size: int = DEFAULT_MAX_WORKERS) -> requests.Session:
+    with _SESSION_LOCK:
+        if pool_size not in _SESSIONS:
+            _SESSIONS[pool_size] = create_session(pool_size)
+        return _SESSIONS[pool_size]
+
+
+class PlaceNotFoundError(Exception):
+    def __init__(self, place_id: str, status_code: int, detail: dict):
+        super().__init__(f"Error: {detail}")
+        self.place_id = place_id
+        self.status_code = status_code
+
+
+def _fetch_place_details(
+    session: requests.Session,
+    place_id: str,
+    rate_limiter: RateLimiter | None = None,
+) -> dict | None:
+    # Google Places APIを用いて情報を取得（指数バックオフ＋ジッターで最大3回試行）
+    if GOOGLE_MAPS_API_KEY is None or GOOGLE_MAPS_API_KEY == "":
+        raise Exception("Error: GOOGLE_MAPS_API_KEY is not set")
+
+    for retry in range(MAX_RETRIES):
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        try:
+            with span("places_api_request"):
+                response = session.get(
+                    f"{GOOGLE_PLACES_API_URL}/{place_id}",
+                    params={
+                        "key": GOOGLE_MAPS_API_KEY,
+                        "fields": ",".join(GET_FIELDS_LIST),
+                        "languageCode": "ja",
+                    },
+                    timeout=REQUEST_TIMEOUT_SECONDS,
+                )
+        # 接続の失敗、タイムアウト、応答の途切れなどは再試行する
+        except requests.RequestException:
+            response = None
+        if response is not None:
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code in NEGATIVE_CACHE_STATUS_CODES:
+                raise PlaceNotFoundError(
+                    place_id, response.status_code, response.json()
+                )
+            # 429はレート制限なので、待ってから再試行する
+            if response.status_code // 100 == 4 and response.status_code != 429:
+                raise Exception(f"Error: {response.json()}")
+        if retry < MAX_RETRIES - 1:
+            time.sleep(random.uniform(0, BACKOFF_BASE_SECONDS * 2**retry))
+    return None
+
+
+def get_google_place_details(
+    place_id: str,
+    disable_cache: bool = False,
+    session: requests.Session | None = None,
+    rate_limiter: RateLimiter | None = None,
+    cache: PlacesCache | None = None,
+) -> GooglePlaceDetail | None:
+
+    cache = cache or get_places_cache()
+    # キャッシュを無効化
+    if disable_cache:
+        cache.delete(place_id)
+
+    # 保存されたデータがあればそれを返す（取得に失敗したIDはNoneを返す）
+    found, data = cache.get(place_id)
+    if found:
+        return None if data is None else GooglePlaceDetail(**data)
+
+    try:
+        data = _fetch_place_details(session or get_session(), place_id, rate_limiter)
+    except PlaceNotFoundError as e:
+        print(e)
+        cache.set(place_id, None, e.status_code)
+        return None
+    if data is None:
+        return None
+    # 保存する
+    cache.set(place_id, data)
+    return GooglePlaceDetail(**data)
+
+
+def _get_google_place_details_batch(
+    place_ids: list[str],
+    disable_cache: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_requests_per_second: float = DEFAULT_MAX_REQUESTS_PER_SECOND,
+) -> dict[str, GooglePlaceDetail]:
+    # 重複のないplaceIDのリストを並行して取得する
+    rate_limiter = RateLimiter(max_requests_per_second)
+    session = get_session(max_workers)
+    cache = get_places_cache()
+    with span("fetch_google_place_details"):
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda place_id: get_google_place_details(
+                    place_id, disable_cache, session, rate_limiter, cache
+                ),
+                place_ids,
+            )
+            # 取得できなかった場所は含めない
+            google_places: dict[str, GooglePlaceDetail] = {
+                place_id: google_place
+                for place_id, google_place in zip(place_ids, results)
+                if google_place is not None
+            }
+
+    return google_places
+
+
+def get_google_place_details_list(
+    visits: list[LocationHistory],
+    disable_cache: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_requests_per_second: float = DEFAULT_MAX_REQUESTS_PER_SECOND,
+) -> dict[str, GooglePlaceDetail]:
+
+    # 重複を除いたplaceIDを、訪問順を保ったまま並行して取得する
+    with span("get_google_place_details_list"):
+        place_ids = list(dict.fromkeys(v.visit.topCandidate.placeID for v in visits))
+        return _get_google_place_details_batch(
+            place_ids, disable_cache, max_workers, max_requests_per_second
+        )
+
+
+class PrefetchStats(BaseModel):
+    visits: int = 0  # 走査した訪問の数
+    unique_place_ids: int = 0  # 重複を除いたplaceIDの数
+    cache_hits: int = 0  # キャッシュにあった数
+    negative_cache_hits: int = 0  # 取得に失敗したと記録されていた数
+    fetched: int = 0  # APIから新たに取得できた数
+    failed: int = 0  # APIから取得できなかった数
+
+    @property
+    def hit_ratio(self) -> float:
+        if self.unique_place_ids == 0:
+            return 0.0
+        return (self.cache_hits + self.negative_cache_hits) / self.unique_place_ids
+
+
+def prefetch_google_place_details(
+    locate_histories: Iterable[LocationHistory],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_requests_per_second: float = DEFAULT_MAX_REQUESTS_PER_SECOND,
+) -> tuple[dict[str, GooglePlaceDetail], PrefetchStats]:
+    # 複数日分の履歴に現れるplaceIDをまとめ、キャッシュにないものだけを1回で並行取得する
+    # 以降の日ごとのget_google_place_details_listはメモリ上のキャッシュだけで完結する
+    stats = PrefetchStats()
+    place_ids: dict[str, None] = {}
+    for locate_history in locate_histories:
+        if not locate_history.visit or not locate_history.visit.topCandidate:
+            continue
+        stats.visits += 1
+        place_ids[locate_history.visit.topCandidate.placeID] = None
+    stats.unique_place_ids = len(place_ids)
+
+    cache = get_places_cache()
+    google_places: dict[str, GooglePlaceDetail] = {}
+    missing_place_ids: list[str] = []
+    with span("read_places_cache"):
+        for place_id in place_ids:
+            found, data = cache.get(place_id)
+            if not found:
+                missing_place_ids.append(place_id)
+            elif data is None:
+                stats.negative_cache_hits += 1
+            else:
+                stats.cache_hits += 1
+                google_places[place_id] = GooglePlaceDetail(**data)
+
+    fetched_places = _get_google_place_details_batch(
+        missing_place_ids,
+        max_workers=max_workers,
+        max_requests_per_second=max_requests_per_second,
+    )
+    stats.fetched = len(fetched_places)
+    stats.failed = len(missing_place_ids) - len(fetched_places)
+    google_places.update(fetched_places)
+    return google_places, stats
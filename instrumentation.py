@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import ContextManager, Iterator
+
+# 処理の段階ごとの実行時間とメモリ使用量を計測する
+# 計測を有効にしていないときは、spanは何もしないコンテキストマネージャを返すだけ
+
+# 計測を有効にする場合の出力先と形式（"json" または "chrome"）
+PROFILE_OUTPUT = os.getenv("PROFILE_OUTPUT")
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "json")
+# tracemallocによるメモリの計測は処理を大きく遅くするため、指定したときだけ行う
+PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "") not in ("", "0", "false")
+
+_NULL_SPAN = nullcontext()
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    start_ns: int  # time.perf_counter_ns()の値
+    wall_ns: int
+    cpu_ns: int  # プロセス全体のCPU時間（スレッドプールで処理した分も含む）
+    # 開始時点からのメモリ使用量の増加分の最大値（プロセス全体、メインスレッドの計測のみ）
+    peak_memory_bytes: int | None
+    depth: int  # 入れ子の深さ
+    pid: int
+    tid: int
+
+
+@dataclass
+class _OpenSpan:
+    name: str
+    start_ns: int
+    start_cpu_ns: int
+    start_memory: int = 0
+    peak_memory: int = 0  # 子の計測でリセットされる前のピーク（絶対値）
+
+
+@dataclass
+class Profiler:
+    trace_memory: bool = False
+    records: list[SpanRecord] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> list[_OpenSpan]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _traces_memory(self) -> bool:
+        # tracemallocのピークはプロセスで1つしかなく、リセットすると他のスレッドの計測を
+        # 壊してしまうため、メモリはメインスレッドの計測でだけ測る
+        return (
+            self.trace_memory
+            and tracemalloc.is_tracing()
+            and threading.current_thread() is threading.main_thread()
+        )
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        stack = self._stack()
+        open_span = _OpenSpan(name, 0, 0)
+        traces_memory = self._traces_memory()
+        if traces_memory:
+            # tracemallocのピークは1つしかないため、親のピークを退避してからリセットする
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak_memory = max(stack[-1].peak_memory, peak)
+            tracemalloc.reset_peak()
+            open_span.start_memory = open_span.peak_memory = current
+        stack.append(open_span)
+        open_span.start_cpu_ns = time.process_time_ns()
+        open_span.start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end_ns = time.perf_counter_ns()
+            end_cpu_ns = time.process_time_ns()
+            stack.pop()
+            peak_memory_bytes = None
+            if traces_memory and tracemalloc.is_tracing():
+                peak = max(open_span.peak_memory, tracemalloc.get_traced_memory()[1])
+                peak_memory_bytes = peak - open_span.start_memory
+                if stack:
+                    stack[-1].peak_memory = max(stack[-1].peak_memory, peak)
+            record = SpanRecord(
+                name=name,
+                start_ns=open_span.start_ns,
+                wall_ns=end_ns - open_span.start_ns,
+                cpu_ns=end_cpu_ns - open_span.start_cpu_ns,
+                peak_memory_bytes=peak_memory_bytes,
+                depth=len(stack),
+                pid=os.getpid(),
+                tid=threading.get_ident(),
+            )
+            with self._lock:
+                self.records.append(record)
+
+    def extend(self, records: list[SpanRecord]) -> None:
+        # 子プロセスで計測した結果を取り込む
+        with self._lock:
+            self.records.extend(records)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        # 段階ごとの回数、合計時間（秒）、メモリのピーク（バイト）
+        summary: dict[str, dict[str, float]] = {}
+        for record in sorted(self.records, key=lambda r: r.start_ns):
+            stage = summary.setdefault(
+                record.name,
+                {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0},
+            )
+            stage["count"] += 1
+            stage["wall_seconds"] += record.wall_ns / 1e9
+            stage["cpu_seconds"] += record.cpu_ns / 1e9
+            if record.peak_memory_bytes is not None:
+                stage["peak_memory_bytes"] = max(
+                    stage.get("peak_memory_bytes", 0), record.peak_memory_bytes
+                )
+        return summary
+
+    def to_json(self) -> dict:
+        return {
+            "summary": self.summary(),
+            "spans": [asdict(record) for record in self.records],
+        }
+
+    def to_chrome_trace(self) -> dict:
+        # chrome://tracing や Perfetto で読み込める形式（時刻はマイクロ秒）
+        events = []
+        for record in self.records:
+            args = {"cpu_ms": record.cpu_ns / 1e6}
+            if record.peak_memory_bytes is not None:
+                args["peak_memory_kb"] = record.peak_memory_bytes / 1024
+            events.append(
+                {
+                    "name": record.name,
+                    "ph": "X",
+                    "ts": record.start_ns / 1e3,
+                    "dur": record.wall_ns / 1e3,
+                    "pid": record.pid,
+                    "tid": record.tid,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: str, format: str = "json") -> None:
+        if format == "chrome":
+            data = self.to_chrome_trace()
+        elif format == "json":
+            data = self.to_json()
+        else:
+            raise ValueError(f"Error: unknown profile format '{format}'")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+_PROFILER: Profiler | None = None
+
+
+def get_profiler() -> Profiler | None:
+    return _PROFILER
+
+
+def enable_profiling(trace_memory: bool = PROFILE_MEMORY) -> Profiler:
+    global _PROFILER
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _PROFILER = Profiler(trace_memory=trace_memory)
+    return _PROFILER
+
+
+def disable_profiling() -> Profiler | None:
+    global _PROFILER
+    profiler = _PROFILER
+    _PROFILER = None
+    if profiler is not None and profiler.trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return profiler
+
+
+def span(name: str) -> ContextManager[None]:
+    # with span("段階の名前"): のように使う
+    if _PROFILER is None:
+        return _NULL_SPAN
+    return _PROFILER.span(name)
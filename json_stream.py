@@ -0,0 +1,66 @@
+import json
+from typing import Any, Iterator
+
+_DECODER = json.JSONDecoder()
+_SEPARATORS = " \t\n\r,"
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def iter_json_array(
+    filepath: str,
+    skip_to: tuple[str, ...] = (),
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Any]:
+    # JSON配列をファイル全体を読み込まずに、要素を1つずつ返す
+    # skip_toを指定すると、その文字列を順に読み飛ばした後に現れる配列を対象とする
+    with open(filepath, "r", encoding="utf-8") as f:
+        buf = f.read(chunk_size)
+        pos = 0
+
+        # 配列の開始位置まで読み進める
+        for token in skip_to + ("[",):
+            while True:
+                idx = buf.find(token, pos)
+                if idx != -1:
+                    pos = idx + len(token)
+                    break
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise ValueError(f"Error: '{token}' not found in {filepath}")
+                # チャンクの境界をまたぐトークンのために末尾を残す
+                buf = buf[max(pos, len(buf) - len(token) + 1) :] + chunk
+                pos = 0
+
+        while True:
+            # 要素間の空白とカンマを読み飛ばす
+            while pos < len(buf) and buf[pos] in _SEPARATORS:
+                pos += 1
+            if pos == len(buf):
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise ValueError(f"Error: unexpected end of {filepath}")
+                buf, pos = chunk, 0
+                continue
+            if buf[pos] == "]":
+                return
+
+            try:
+                item, end = _DECODER.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                item, end = None, -1
+            # 要素がチャンクの境界で途切れている場合は追加で読み込む
+            # (数値は途中で途切れていてもデコードに成功してしまうため、直後の文字も確認する)
+            if end == -1 or (
+                not isinstance(item, (dict, list))
+                and (end == len(buf) or buf[end] not in _SEPARATORS + "]")
+            ):
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    if end == -1 or end < len(buf):
+                        raise ValueError(f"Error: invalid JSON in {filepath}")
+                else:
+                    buf = buf[pos:] + chunk
+                    pos = 0
+                    continue
+            yield item
+            pos = end
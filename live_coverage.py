@@ -0,0 +1,193 @@
+import math
+import threading
+from typing import Iterable
+
+import numpy as np
+import shapely
+from shapely.geometry import GeometryCollection, LineString, Polygon
+from shapely.geometry.base import BaseGeometry
+
+from geo_area_calculator import (
+    R,
+    TOTAL_AREA_CHUNK_POINTS,
+    calculate_projected_area,
+    geodesic_point_buffer,
+)
+from models.LocationHistory import LocationHistory
+from models.LocationRecord import LocationRecord
+from objective_score import BUFFER_METERS, COVERAGE_RADIUS_METERS
+from trajectory import extract_trajectory_arrays
+
+# 確定した範囲をマスごとに和集合として持つ格子の1マスの大きさ（経緯度、約400メートル）
+# マスが小さいほど、同じ場所を何度も通ったときの1マスあたりの図形が単純になる
+LIVE_INDEX_CELL_DEGREES = 0.004
+
+_EMPTY = Polygon()
+GEOMETRY_COLLECTION_TYPE_ID = 7
+
+
+class LiveCoverage:
+    # 旅行中に届く記録を順に追加し、総移動面積と網羅性スコアをその場で更新する
+    # calculate_total_polygonと同じ区切りで軌跡をバッファし、新しい部分のうち
+    # 既存の範囲と重ならない部分の面積だけを足していく
+    # 確定した範囲は格子のマスごとの和集合として持ち、新しい部分はかかるマスの図形とだけ
+    # 比べるため、同じ場所を何度も通っても1点あたりの計算量は軌跡の長さによらない
+    # 点は連続する同じ座標を除くだけで、calculate_coverage_scoreのpreprocess_trajectoryによる
+    # 滞在点の集約と間引きは行わない（間引きは軌跡全体が揃わないと決まらないため）
+    # そのため同じ日の値でも、保存されるスコアとはその誤差（総移動面積で0.1%未満）だけ異なる
+    def __init__(
+        self,
+        center_lat: float,
+        center_lon: float,
+        radius_meters: float = COVERAGE_RADIUS_METERS,
+        buffer_meters: float = BUFFER_METERS,
+    ):
+        self.buffer_degrees = buffer_meters / R * 180 / math.pi
+        self.circle = geodesic_point_buffer(center_lat, center_lon, radius_meters)
+        shapely.prepare(self.circle)
+        self.circle_area = calculate_projected_area(self.circle)
+
+        self._pieces: list[BaseGeometry] = []
+        self._cell_unions: dict[tuple[int, int], BaseGeometry] = {}
+        # 確定した部分の面積と、そのうち観光範囲円に含まれる面積
+        self._area = 0.0
+        self._covered_area = 0.0
+        # まだ区切りに達していない点（先頭は確定した部分の最後の点）
+        self._pending: list[tuple[float, float]] = []
+        # 区切りに達していない部分の (面積, 円内の面積)。次の追加まで使い回す
+        self._pending_areas: tuple[float, float] | None = (0.0, 0.0)
+        self._polygon: BaseGeometry | None = Polygon()
+        self._lock = threading.Lock()
+
+    def _cells(
+        self, bounds: tuple[float, float, float, float]
+    ) -> list[tuple[int, int]]:
+        min_x, min_y, max_x, max_y = (
+            math.floor(b / LIVE_INDEX_CELL_DEGREES) for b in bounds
+        )
+        return [
+            (x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)
+        ]
+
+    def _split_by_cells(
+        self, piece: BaseGeometry
+    ) -> tuple[list[tuple[int, int]], np.ndarray]:
+        # 追加する部分を格子のマスごとに切り分ける（かからないマスは除く）
+        cells = self._cells(piece.bounds)
+        corners = np.array(cells, dtype=float) * LIVE_INDEX_CELL_DEGREES
+        boxes = shapely.box(
+            corners[:, 0],
+            corners[:, 1],
+            corners[:, 0] + LIVE_INDEX_CELL_DEGREES,
+            corners[:, 1] + LIVE_INDEX_CELL_DEGREES,
+        )
+        parts = shapely.intersection(piece, boxes)
+        # マスの辺に接するだけの線や点は除き、面の部分だけを残す
+        collections = shapely.get_type_id(parts) == GEOMETRY_COLLECTION_TYPE_ID
+        parts[collections] = [
+            shapely.union_all(
+                [g for g in shapely.get_parts(part) if shapely.area(g) > 0]
+            )
+            for part in parts[collections]
+        ]
+        keep = shapely.area(parts) > 0
+        return [cell for cell, k in zip(cells, keep) if k], parts[keep]
+
+    def _new_areas(
+        self, cells: list[tuple[int, int]], parts: np.ndarray
+    ) -> tuple[float, float]:
+        # マスごとに既存の範囲と重なる部分を除き、その面積と円内の面積を求める
+        unions = np.array(
+            [self._cell_unions.get(cell, _EMPTY) for cell in cells], dtype=object
+        )
+        new_parts = shapely.difference(parts, unions)
+        new_parts = new_parts[~shapely.is_empty(new_parts)]
+        if len(new_parts) == 0:
+            return 0.0, 0.0
+        area = calculate_projected_area(GeometryCollection(list(new_parts)))
+        covered_parts = new_parts[shapely.intersects(self.circle, new_parts)]
+        covered_area = 0.0
+        if len(covered_parts) > 0:
+            covered_area = calculate_projected_area(
+                GeometryCollection(
+                    list(shapely.intersection(covered_parts, self.circle))
+                )
+            )
+        return area, covered_area
+
+    def _buffer(self, points: list[tuple[float, float]]) -> BaseGeometry:
+        lonlat = np.asarray(points, dtype=float)[:, ::-1]
+        return shapely.buffer(
+            LineString(lonlat), self.buffer_degrees, quad_segs=16, cap_style="round"
+        )
+
+    def _flush(self) -> None:
+        # 区切りに達した点をバッファして確定した部分に加える
+        piece = self._buffer(self._pending)
+        cells, parts = self._split_by_cells(piece)
+        area, covered_area = self._new_areas(cells, parts)
+        self._area += area
+        self._covered_area += covered_area
+        for cell, part in zip(cells, parts):
+            union = self._cell_unions.get(cell)
+            self._cell_unions[cell] = (
+                part if union is None else shapely.union(union, part)
+            )
+        self._pieces.append(piece)
+        self._pending = self._pending[-1:]
+
+    def append_point(self, lat: float, lon: float) -> None:
+        with self._lock:
+            if self._pending and self._pending[-1] == (lat, lon):
+                return
+            self._pending.append((lat, lon))
+            self._pending_areas = None
+            self._polygon = None
+            if len(self._pending) == TOTAL_AREA_CHUNK_POINTS + 1:
+                self._flush()
+
+    def append(self, locate_history: LocationHistory | LocationRecord) -> None:
+        # 記録の座標を、calculate_coverage_scoreと同じ順に追加する
+        # (間引く前の軌跡のまま追加する。クラスのコメントを参照)
+        latlon = extract_trajectory_arrays([locate_history]).latlon
+        for lat, lon in latlon.tolist():
+            self.append_point(lat, lon)
+
+    def extend(
+        self, locate_histories: Iterable[LocationHistory] | Iterable[LocationRecord]
+    ) -> None:
+        for locate_history in locate_histories:
+            self.append(locate_history)
+
+    def _get_pending_areas(self) -> tuple[float, float]:
+        if self._pending_areas is None:
+            if len(self._pending) < 2:
+                self._pending_areas = (0.0, 0.0)
+            else:
+                self._pending_areas = self._new_areas(
+                    *self._split_by_cells(self._buffer(self._pending))
+                )
+        return self._pending_areas
+
+    @property
+    def total_area(self) -> float:
+        with self._lock:
+            return self._area + self._get_pending_areas()[0]
+
+    @property
+    def coverage_ratio(self) -> float:
+        with self._lock:
+            return (
+                self._covered_area + self._get_pending_areas()[1]
+            ) / self.circle_area
+
+    @property
+    def polygon(self) -> BaseGeometry:
+        # 総移動範囲の図形（取得したときに和集合をとり、次の追加まで使い回す）
+        with self._lock:
+            if self._polygon is None:
+                pieces = list(self._pieces)
+                if len(self._pending) >= 2:
+                    pieces.append(self._buffer(self._pending))
+                self._polygon = shapely.union_all(pieces) if pieces else Polygon()
+            return self._polygon
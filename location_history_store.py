@@ -0,0 +1,76 @@
+import json
+import sqlite3
+from typing import Iterator
+
+from json_stream import iter_json_array
+
+LOCATION_HISTORY_STORE_PATH = "data/location-history.sqlite3"
+
+
+def build_location_history_store(
+    input_file: str,
+    store_path: str = LOCATION_HISTORY_STORE_PATH,
+    batch_size: int = 10000,
+) -> int:
+    # エクスポートを1回だけ走査して、日付でクラスタ化されたSQLiteストアを作る
+    # (date, seq)を主キーにすることで、1日分のレコードがディスク上で連続して並ぶ
+    conn = sqlite3.connect(store_path)
+    count = 0
+    try:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS location_history")
+            conn.execute(
+                "CREATE TABLE location_history ("
+                " date TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " record TEXT NOT NULL,"
+                " PRIMARY KEY (date, seq)"
+                ") WITHOUT ROWID"
+            )
+            rows: list[tuple[str, int, str]] = []
+            for item in iter_json_array(input_file):
+                if "activity" not in item and "visit" not in item:
+                    continue
+                if "startTime" not in item:
+                    print("Error: Invalid data format in one of the items.")
+                    continue
+                rows.append(
+                    (
+                        item["startTime"][:10],
+                        count,
+                        json.dumps(item, ensure_ascii=False, separators=(",", ":")),
+                    )
+                )
+                count += 1
+                if len(rows) >= batch_size:
+                    conn.executemany(
+                        "INSERT INTO location_history VALUES (?, ?, ?)", rows
+                    )
+                    rows = []
+            conn.executemany("INSERT INTO location_history VALUES (?, ?, ?)", rows)
+    finally:
+        conn.close()
+    return count
+
+
+def iter_location_history_records(
+    start_date: str, end_date: str, store_path: str = LOCATION_HISTORY_STORE_PATH
+) -> Iterator[dict]:
+    # 主キーのインデックスで対象日の先頭へ直接移動し、そこから連続して読む
+    conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(
+            "SELECT record FROM location_history"
+            " WHERE date BETWEEN ? AND ? ORDER BY date, seq",
+            (start_date, end_date),
+        )
+        for (record,) in cursor:
+            yield json.loads(record)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    input_json_file = "data/location-history.json"
+    num_records = build_location_history_store(input_json_file)
+    print(f"{num_records} records stored in '{LOCATION_HISTORY_STORE_PATH}'")
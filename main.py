@@ -1,355 +1,268 @@
-import json
-import time
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import requests
 from pydantic import ValidationError
-import os
-import random
+from typing import Iterable, Iterator
 from dotenv import load_dotenv
-import numpy as np
 
 load_dotenv()
 
-# Google Maps APIキーの環境変数読み込み
-GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY")
-
 from models.LocationHistory import LocationHistory
+from models.LocationRecord import LocationRecord
 from models.GooglePlaceDetail import GooglePlaceDetail
+from models.ObjectiveScore import ObjectiveScore
+from models.SpreadsheetManualData import SpreadsheetManualData
 
-from geo_area_calculator import calculate_total_area, calculate_coverage_ratio
-from get_spread_sheet import (
-    get_latitude_longitude_from_spreadsheet,
-    get_manual_data_for_importance_score,
+from google_places import prefetch_google_place_details
+
+from json_stream import iter_json_array
+from location_history_store import (
+    LOCATION_HISTORY_STORE_PATH,
+    iter_location_history_records,
 )
 
+from get_spread_sheet import get_spreadsheet_manual_data, set_spreadsheet_manual_data
+from objective_score import (
+    calculate_objective_score,
+    calculate_satisfaction_efficiency_correlation,
+)
+from reporter import PrintReporter, QuietReporter, Reporter
+from step_count_store import ensure_step_count_store
+from instrumentation import (
+    PROFILE_FORMAT,
+    PROFILE_OUTPUT,
+    SpanRecord,
+    disable_profiling,
+    enable_profiling,
+    get_profiler,
+    span,
+)
+from data.extract_location_history_by_date import date_range
 
-def load_location_history_list(filepath: str) -> list[LocationHistory]:
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
-    location_history_list: list[LocationHistory] = []
-    for row in data:
-        if "activity" not in row and "visit" not in row:
-            continue
+def parse_location_history(rows: Iterable[dict]) -> Iterator[LocationHistory]:
+    for row in rows:
         try:
-            location_history = LocationHistory(**row)
-            location_history_list.append(location_history)
+            yield LocationHistory(**row)
         except ValidationError as e:
             print(f"Error: {e}")
 
-    return location_history_list
-
-
-def get_google_place_details(
-    place_id: str, disable_cache: bool = False
-) -> GooglePlaceDetail | None:
-
-    get_fields_list = [
-        "name",
-        "id",
-        "types",
-        "formattedAddress",
-        "rating",
-        "displayName",
-        "primaryType",
-    ]
-
-    if not os.path.exists("places"):
-        os.makedirs("places")
-    # キャッシュを無効化
-    if disable_cache:
-        if os.path.exists(f"places/{place_id}.json"):
-            os.remove(f"places/{place_id}.json")
-
-    # 保存されたファイルがあればそれを返す
-    if os.path.exists(f"places/{place_id}.json"):
-        with open(f"places/{place_id}.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return GooglePlaceDetail(**data)
-
-    # Google Places APIを用いて情報を取得（3回繰り返す）
-    if GOOGLE_MAPS_API_KEY is None or GOOGLE_MAPS_API_KEY == "":
-        raise Exception("Error: GOOGLE_MAPS_API_KEY is not set")
-
-    response = None
-    retry = 0
-    while retry < 3:
-        response = requests.get(
-            f"https://places.googleapis.com/v1/places/{place_id}",
-            params={
-                "key": GOOGLE_MAPS_API_KEY,
-                "fields": ",".join(get_fields_list),
-                "languageCode": "ja",
-            },
+
+def parse_location_records(rows: Iterable[dict]) -> Iterator[LocationRecord]:
+    # 検証を省いた高速な読み込み（エラーの詳細を確認するときはparse_location_historyを使う）
+    for row in rows:
+        try:
+            yield LocationRecord.from_dict(row)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Error: {e!r}")
+
+
+def _parse_rows(
+    rows: Iterable[dict], fast: bool
+) -> Iterator[LocationHistory] | Iterator[LocationRecord]:
+    return parse_location_records(rows) if fast else parse_location_history(rows)
+
+
+def iter_location_history(
+    filepath: str,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    fast: bool = False,
+) -> Iterator[LocationHistory] | Iterator[LocationRecord]:
+    # エクスポートを1件ずつ読み込み、日付範囲外のレコードは検証前に捨てる
+    # start_date, end_dateは"YYYY-MM-DD"形式で、両端を含む
+    # fast=Trueの場合はpydanticのLocationHistoryの代わりにLocationRecordを返す
+    def _rows() -> Iterator[dict]:
+        for row in iter_json_array(filepath):
+            if "activity" not in row and "visit" not in row:
+                continue
+            if start_date is not None or end_date is not None:
+                # startTimeは現地時刻のISO形式なので、先頭10文字が日付になる
+                date = row.get("startTime", "")[:10]
+                if start_date is not None and date < start_date:
+                    continue
+                if end_date is not None and date > end_date:
+                    continue
+            yield row
+
+    return _parse_rows(_rows(), fast)
+
+
+def load_location_history_list(
+    filepath: str,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    fast: bool = False,
+) -> list[LocationHistory] | list[LocationRecord]:
+    return list(iter_location_history(filepath, start_date, end_date, fast))
+
+
+# build_location_history_storeで作成したストアから、指定した日付のレコードを読み込む
+def load_range(
+    start_date: str,
+    end_date: str,
+    store_path: str = LOCATION_HISTORY_STORE_PATH,
+    fast: bool = False,
+) -> list[LocationHistory] | list[LocationRecord]:
+    return list(
+        _parse_rows(
+            iter_location_history_records(start_date, end_date, store_path), fast
         )
-        if response.status_code == 200:
-            break
-        if response.status_code // 100 == 4:
-            raise Exception(f"Error: {response.json()}")
-        retry += 1
-        time.sleep(random.randint(1000, 3000) / 1000)
-
-    if response is None:
-        return None
-    if response.status_code != 200:
-        return None
-    # 保存する
-    with open(f"places/{place_id}.json", "w", encoding="utf-8") as f:
-        json.dump(response.json(), f, ensure_ascii=False, indent=4)
-    data = response.json()
-    return GooglePlaceDetail(**data)
-
-
-def get_google_place_details_list(
-    visits: list[LocationHistory], disable_cache: bool = False
-) -> dict[str, GooglePlaceDetail]:
+    )
 
-    google_places: dict[str, GooglePlaceDetail] = {}
-    for v in visits:
-        place_id = v.visit.topCandidate.placeID
-        if place_id in google_places:
-            continue
-        google_place = get_google_place_details(place_id, disable_cache)
-        google_places[place_id] = google_place
 
-    return google_places
+def load_day(
+    date: str, store_path: str = LOCATION_HISTORY_STORE_PATH, fast: bool = False
+) -> list[LocationHistory] | list[LocationRecord]:
+    return load_range(date, date, store_path, fast)
 
 
-def load_predefined_genres_by_google_places_api() -> dict[str, set[str]]:
-    # Google Places APIで事前定義されているタイプを全て取得する
-    with open("predefined_genres.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    predefined_genres = {
-        cat: set(genres["subcategories"]) for cat, genres in data.items()
-    }
-    return predefined_genres
+# ストアがあればそこから、なければ日ごとに分割したファイルから読み込む
+# スコア計算では検証を省いたLocationRecordを使う
+# (1000件でも、読み込みと座標の取り出しを合わせて速い: benchmarks.bench_location_history)
+def load_location_history_for_date(
+    date: str, fast: bool = True
+) -> list[LocationHistory] | list[LocationRecord]:
+    if os.path.exists(LOCATION_HISTORY_STORE_PATH):
+        return load_day(date, fast=fast)
+    filepath = f"data/location-history_{date}.json"
+    if not os.path.exists(filepath):
+        return []
+    return load_location_history_list(filepath, fast=fast)
 
 
 def parse_datetime(datetime_str: str) -> datetime:
     return datetime.strptime(datetime_str, "%Y-%m-%dT%H:%M:%S.%f%z")
 
 
-# LocationHistoryをvisitsとactivitiesに分けて戻す
-def split_location_history(
-    locate_histories: list[LocationHistory],
-) -> tuple[list[LocationHistory], list[LocationHistory]]:
-
-    visits: list[LocationHistory] = []
-    activities: list[LocationHistory] = []
-
-    for locate_history in locate_histories:
-        if locate_history.visit:
-            visits.append(locate_history)
-        elif locate_history.activity:
-            activities.append(locate_history)
-
-    return visits, activities
-
-
-# 客観的スコア
-def calculate_objective_score(
+# 子プロセスへ渡すのはその日に訪れた場所だけにする
+def _visited_places(
     locate_histories: list[LocationHistory], places: dict[str, GooglePlaceDetail]
-) -> float:
-
-    date = locate_histories[0].startTime.split("T")[0]
-    lat, lon = get_latitude_longitude_from_spreadsheet(date)
-
-    visits, activities = split_location_history(locate_histories)
-
-    # 観光範囲円内の総移動面積の割合 coverage score
-    def _calculate_coverage_score(
-        _locate_histories: list[LocationHistory],
-        _visits: list[LocationHistory],
-        _activities: list[LocationHistory],
-    ) -> float:
-        coordinates = []
-        for act in _locate_histories:
-            if act.activity:
-                coordinates.append(
-                    (
-                        float(act.activity.start.split(",")[0][4:]),
-                        float(act.activity.start.split(",")[1]),
-                    )
-                )
-                coordinates.append(
-                    (
-                        float(act.activity.end.split(",")[0][4:]),
-                        float(act.activity.end.split(",")[1]),
-                    )
-                )
-            if act.visit:
-                coordinates.append(
-                    (
-                        float(act.visit.topCandidate.placeLocation.split(",")[0][4:]),
-                        float(act.visit.topCandidate.placeLocation.split(",")[1]),
-                    )
-                )
-        print(coordinates)
-
-        # 総移動面積を計算
-        total_area, total_poly = calculate_total_area(coordinates, 80.0)
-        print(f"総移動面積(移動周囲80メートル): {total_area} 平方メートル")
+) -> dict[str, GooglePlaceDetail]:
+    return {
+        h.visit.topCandidate.placeID: places[h.visit.topCandidate.placeID]
+        for h in locate_histories
+        if h.visit and h.visit.topCandidate.placeID in places
+    }
 
-        # 特定の座標の半径1.5km内の総移動面積の占める割合を計算
-        center_lat = lat
-        center_lon = lon
-        radius_meters = 1200
 
-        ratio = calculate_coverage_ratio(
-            center_lat, center_lon, radius_meters, total_poly
-        )
-        print(
-            f"拠点駅を中心とした円内における、総移動面積の占める割合: {ratio}",
-            end="\n\n",
-        )
-        return ratio
-
-    coverage_score = _calculate_coverage_score(locate_histories, visits, activities)
-
-    # 観光スポットのジャンル多様性スコア diversity score
-    def _calculate_diversity_score(
-        _visits: list[LocationHistory], _places: dict[str, GooglePlaceDetail]
-    ) -> float:
-        all_visited_genres = set()
-        for v in _visits:
-            place_id = v.visit.topCandidate.placeID
-            if place_id not in _places:
-                continue
-            all_visited_genres.update(_places[place_id].types)
-        predefined_genre_categories = load_predefined_genres_by_google_places_api()
-
-        all_visited_categories = set()
-        for genre in all_visited_genres:
-            for cat, genres in predefined_genre_categories.items():
-                if genre in genres:
-                    all_visited_categories.add(cat)
-                    break
-
-        _genre_diversity_score = len(all_visited_categories) / len(
-            predefined_genre_categories
+# 子プロセスで1日分のスコアを計算し、計測を有効にした場合は計測結果も親プロセスに返す
+# 手動入力データは引数で受け取るため、spawnで起動した子プロセスでも取得し直さない
+def _calculate_objective_score_worker(
+    locate_histories: list[LocationHistory],
+    places: dict[str, GooglePlaceDetail],
+    manual_data: SpreadsheetManualData,
+    reporter: Reporter,
+    use_cache: bool,
+    profile: bool,
+    trace_memory: bool,
+) -> tuple[ObjectiveScore, list[SpanRecord]]:
+    set_spreadsheet_manual_data(manual_data)
+    if not profile:
+        return (
+            calculate_objective_score(locate_histories, places, reporter, use_cache),
+            [],
         )
-        print(all_visited_categories)
-        print("訪れたジャンルカテゴリの数:", len(all_visited_categories))
-        print("定義されているジャンルカテゴリの数:", len(predefined_genre_categories))
-        print("観光スポットのジャンル多様性スコア:", _genre_diversity_score, end="\n\n")
-        return _genre_diversity_score
-
-    genre_diversity_score = _calculate_diversity_score(visits, places)
-
-    # p@5重要性スコア importance score
-    def _calculate_importance_score(_visits: list[LocationHistory]) -> float:
-        labels = get_manual_data_for_importance_score(date)
-        # p@5 を計算する
-        p_at_5 = sum([1 if v[1] else 0 for v in labels]) / len(labels)
-        print("p@5(トリップアドバイザーから抽出):", p_at_5, end="\n\n")
-        return p_at_5
-
-    importance_score = _calculate_importance_score(visits)
-
-    # 一貫性スコア consistency score
-    def _calculate_consistency_score(
-        _visits: list[LocationHistory], _places: dict[str, GooglePlaceDetail]
-    ) -> float:
-
-        # 手動入力
-        predefined_spots = [
-            "ChIJBYa7A0Iz-F8R6qe7HgH2XV0",
-            "ChIJodnti8vM-V8RVsLa8q-bYRs",
-            "ChIJ7fRyA8jM-V8RNuY11cu1Jlo",
-            "ChIJBYa7A0Iz-F8R6qe7HgH2XV0",
-            "ChIJhycOJtYz-F8RO54LaTG6_p0",
-            "ChIJF_AqPH4z-F8Rmtm1IKiShVQ",
-            "ChIJATPRNwAz-F8RcRE30FR7L78",
-            "ChIJBVmy-YMz-F8R5PID8D17Cpc",
-            "ChIJQ1TRt4cz-F8RxkcdIAmz2QU",
-            "ChIJsfC6oXQz-F8RdA1qXiF6jLs",
-            "ChIJR-yGmXMz-F8Rf07-P4u1PUM",
-            "ChIJBYa7A0Iz-F8R6qe7HgH2XV0",
-            "ChIJDT75skEz-F8RFWwV4pI3cpI",
-        ]
-        predefined_spots = set(predefined_spots)
-        actually_visited_spots = set([v.visit.topCandidate.placeID for v in _visits])
-        for v in _visits:
-            _id = v.visit.topCandidate.placeID
-            print(v.visit.topCandidate.placeID, _places[_id].displayName["text"])
-
-        _consistency_score = len(
-            set(predefined_spots) & set(actually_visited_spots)
-        ) / len(actually_visited_spots | predefined_spots)
-        print(
-            "訪れたスポットのうち、事前に設定されたスポットの比率:",
-            _consistency_score,
-            end="\n\n",
+    profiler = enable_profiling(trace_memory)
+    try:
+        with span("calculate_objective_score"):
+            score = calculate_objective_score(
+                locate_histories, places, reporter, use_cache
+            )
+    finally:
+        disable_profiling()
+    return score, profiler.records
+
+
+# 複数日の客観的スコアをプロセスプールで並列に計算する
+# 途中経過は既定では出力しない
+# 記録や手動入力データがない日は、エラーを出力して飛ばす
+def calculate_objective_scores(
+    dates: list[str],
+    max_workers: int | None = None,
+    reporter: Reporter | None = None,
+    use_cache: bool = True,
+) -> list[ObjectiveScore]:
+    # use_cacheがTrueなら、入力が前回から変わっていない指標は計算し直さない
+    reporter = reporter or QuietReporter()
+    locate_histories_by_date: dict[str, list[LocationHistory]] = {}
+    for date in dates:
+        with span("load_location_history"):
+            locate_histories = load_location_history_for_date(date)
+        if not locate_histories:
+            reporter.log("Error: Location history not found for", date)
+            continue
+        locate_histories_by_date[date] = locate_histories
+
+    # 場所の詳細と手動入力データは親プロセスで一度だけ取得し、子プロセスに渡す
+    with span("prefetch_google_place_details"):
+        places, stats = prefetch_google_place_details(
+            h for hs in locate_histories_by_date.values() for h in hs
         )
-        return _consistency_score
-
-    consistency_score = _calculate_consistency_score(visits, places)
-
-    # 移動時間比率スコア efficiency score
-    # def _calculate_efficiency_score(_activities: list[LocationHistory]) -> float:
-    #     total_distance_meters = sum(
-    #         float(a.activity.distanceMeters) for a in _activities
-    #     )
-    #     not_walk_distance_meters = sum(
-    #         (
-    #             float(a.activity.distanceMeters)
-    #             if a.activity.topCandidate.type == "cycling"
-    #             else float(a.activity.distanceMeters) * 0.5
-    #         )
-    #         for a in _activities
-    #         if a.activity.topCandidate.type not in ["walking"]
-    #     )
-    #     _not_walk_ratio = not_walk_distance_meters / total_distance_meters
-    #     print("総移動距離:", total_distance_meters)
-    #     print("徒歩以外の移動時間:", not_walk_distance_meters)
-    #     print("移動時間比率スコア:", _not_walk_ratio, end="\n\n")
-    #     return _not_walk_ratio
-
-    def _calculate_efficiency_score_(_date: str) -> float:
-        with open("data/StepCount_10sec.json", "r") as f:
-            steps = json.load(f)
-        total_qty = 0.0
-        start_time_str = f"{_date} 11:00:00 +0900"
-        end_time_str = f"{_date} 19:00:00 +0900"
-        start_time = datetime.strptime(start_time_str, "%Y-%m-%d %H:%M:%S %z")
-        end_time = datetime.strptime(end_time_str, "%Y-%m-%d %H:%M:%S %z")
-        for item in steps:
-            item_date = datetime.strptime(item["date"], "%Y-%m-%d %H:%M:%S %z")
-            if start_time <= item_date <= end_time:
-                total_qty += item["qty"]
-        print()
-        print("歩数量:", total_qty)
-        max_steps = 30000
-        ratio = (max_steps - total_qty) / max_steps
-        print("歩数比率:", ratio)
-        print()
-        return ratio
-
-    efficiency_score = _calculate_efficiency_score_(date)
-
-    def _calculate_correlation():
-        satisfaction = np.array([0.8, 0.8, 0.8, 1.0, 1.0])
-        efficiency = np.array([0.202, 0.419, 0.482, 0.56, 0.539])
-        correlation_coefficient = np.corrcoef(satisfaction, efficiency)[0, 1]
-        print("満足度と効率性の相関係数:", correlation_coefficient)
-
-    _calculate_correlation()
-
-    print()
-    print("網羅性: ", coverage_score)
-    print("多様性: ", genre_diversity_score)
-    print("重要性: ", importance_score)
-    print("一貫性: ", consistency_score)
-    print("効率性: ", efficiency_score)
+    reporter.log(stats)
+    with span("get_spreadsheet_manual_data"):
+        manual_data = get_spreadsheet_manual_data()
+    # 歩数のJSONが更新されていれば、子プロセスごとに作り直さないよう親プロセスで作り直す
+    with span("ensure_step_count_store"):
+        ensure_step_count_store()
+
+    profiler = get_profiler()
+    scores = []
+    with span("calculate_objective_scores"):
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                date: executor.submit(
+                    _calculate_objective_score_worker,
+                    locate_histories,
+                    _visited_places(locate_histories, places),
+                    manual_data,
+                    reporter,
+                    use_cache,
+                    profiler is not None,
+                    profiler is not None and profiler.trace_memory,
+                )
+                for date, locate_histories in locate_histories_by_date.items()
+            }
+            for date, future in futures.items():
+                try:
+                    score, records = future.result()
+                except Exception as e:
+                    reporter.log("Error: Failed to calculate score for", date, repr(e))
+                    continue
+                scores.append(score)
+                if profiler is not None:
+                    profiler.extend(records)
+    return scores
+
+
+def calculate_objective_scores_for_range(
+    start_date: str,
+    end_date: str,
+    max_workers: int | None = None,
+    reporter: Reporter | None = None,
+    use_cache: bool = True,
+) -> list[ObjectiveScore]:
+    return calculate_objective_scores(
+        date_range(start_date, end_date), max_workers, reporter, use_cache
+    )
 
 
 def main():
-    date = "2025-02-16"
-    filepath = f"data/location-history_{date}.json"
-    locate_histories = load_location_history_list(filepath)
-    visits, activities = split_location_history(locate_histories)
-    places = get_google_place_details_list(visits)
-    calculate_objective_score(locate_histories, places)
+    # PROFILE_OUTPUTを指定すると、段階ごとの計測結果をそのファイルに書き出す
+    if PROFILE_OUTPUT:
+        enable_profiling()
+
+    dates = ["2025-02-16"]
+    with span("main"):
+        scores = calculate_objective_scores(dates, reporter=PrintReporter())
+    for score in scores:
+        print(score)
+    print("満足度と効率性の相関係数:", calculate_satisfaction_efficiency_correlation())
+
+    profiler = disable_profiling()
+    if profiler is not None:
+        profiler.save(PROFILE_OUTPUT, PROFILE_FORMAT)
+        print(f"Profile written to '{PROFILE_OUTPUT}'")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+
+
+def _parse_geo(geo_str: str) -> tuple[float, float]:
+    # "geo:35.6,139.5"形式の文字列を(緯度, 経度)に変換
+    lat, lon = geo_str[4:].split(",")
+    return float(lat), float(lon)
+
+
+def _parse_float(value: str | None) -> float | None:
+    return None if value is None else float(value)
+
+
+# LocationHistoryの軽量版。検証を省き、数値は読み込み時に一度だけ変換する
+# 時刻は文字列のまま持ち、extract_trajectory_arraysでまとめて変換する
+# 属性名はLocationHistoryとそろえてあり、座標は(緯度, 経度)のタプルで持つ
+@dataclass(slots=True)
+class LocationRecord:
+
+    @dataclass(slots=True)
+    class Visit:
+
+        @dataclass(slots=True)
+        class TopCandidate:
+            probability: float | None = None
+            semanticType: str | None = None
+            placeID: str | None = None
+            placeLocation: tuple[float, float] | None = None
+
+        hierarchyLevel: int | None = None
+        topCandidate: TopCandidate | None = None
+        probability: float | None = None
+        isTimelessVisit: bool | None = None
+
+    @dataclass(slots=True)
+    class Activity:
+
+        @dataclass(slots=True)
+        class TopCandidate:
+            type: str | None = None
+            probability: float | None = None
+
+        start: tuple[float, float]
+        end: tuple[float, float]
+        probability: float | None = None
+        topCandidate: TopCandidate | None = None
+        distanceMeters: float | None = None
+
+    endTime: str
+    startTime: str
+    visit: Visit | None = None
+    activity: Activity | None = None
+
+    @classmethod
+    def from_dict(cls, row: dict) -> "LocationRecord":
+        visit = None
+        if row.get("visit") is not None:
+            v = row["visit"]
+            top_candidate = None
+            if v.get("topCandidate") is not None:
+                c = v["topCandidate"]
+                place_location = c.get("placeLocation")
+                top_candidate = cls.Visit.TopCandidate(
+                    probability=_parse_float(c.get("probability")),
+                    semanticType=c.get("semanticType"),
+                    placeID=c.get("placeID"),
+                    placeLocation=(
+                        None if place_location is None else _parse_geo(place_location)
+                    ),
+                )
+            hierarchy_level = v.get("hierarchyLevel")
+            is_timeless_visit = v.get("isTimelessVisit")
+            visit = cls.Visit(
+                hierarchyLevel=(
+                    None if hierarchy_level is None else int(hierarchy_level)
+                ),
+                topCandidate=top_candidate,
+                probability=_parse_float(v.get("probability")),
+                isTimelessVisit=(
+                    None
+                    if is_timeless_visit is None
+                    else str(is_timeless_visit).lower() == "true"
+                ),
+            )
+
+        activity = None
+        if row.get("activity") is not None:
+            a = row["activity"]
+            top_candidate = None
+            if a.get("topCandidate") is not None:
+                c = a["topCandidate"]
+                top_candidate = cls.Activity.TopCandidate(
+                    type=c.get("type"),
+                    probability=_parse_float(c.get("probability")),
+                )
+            activity = cls.Activity(
+                start=_parse_geo(a["start"]),
+                end=_parse_geo(a["end"]),
+                probability=_parse_float(a.get("probability")),
+                topCandidate=top_candidate,
+                distanceMeters=_parse_float(a.get("distanceMeters")),
+            )
+
+        return cls(
+            endTime=row["endTime"],
+            startTime=row["startTime"],
+            visit=visit,
+            activity=activity,
+        )
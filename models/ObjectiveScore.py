@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+
+
+class ObjectiveScore(BaseModel):
+    date: str
+    coverage: float  # 網羅性
+    diversity: float  # 多様性
+    importance: float  # 重要性
+    consistency: float  # 一貫性
+    efficiency: float  # 効率性
+
+    # スコアの計算に使った中間値
+    total_area: float | None = None  # 総移動面積（平方メートル）
+    visited_categories: list[str] = Field(
+        default_factory=list
+    )  # 訪れたジャンルカテゴリ
+    step_count: float | None = None  # 11時から19時までの歩数
@@ -1,4 +1,17 @@
-from pydantic import BaseModel
+import re
+
+from pydantic import BaseModel, PrivateAttr
+
+_MANUAL_DATE_PATTERN = re.compile(r"(\d+)年(\d+)月(\d+)日")
+
+
+def normalize_manual_date(date: str) -> str:
+    # スプレッドシートの"2025年2月16日"形式の日付を"2025-02-16"形式にそろえる
+    match = _MANUAL_DATE_PATTERN.fullmatch(date.strip())
+    if match is None:
+        return date
+    y, m, d = (int(v) for v in match.groups())
+    return f"{y:04d}-{m:02d}-{d:02d}"
 
 
 class SpreadsheetManualData(BaseModel):
@@ -29,3 +42,33 @@ class SpreadsheetManualData(BaseModel):
         efficiency: float
 
     index_PDCA: list[IndexPDCA]
+
+    # "YYYY-MM-DD"形式の日付をキーとする索引（同じ日付が複数ある場合は先頭の行）
+    _coordinate_by_date: dict[str, Coordinate] = PrivateAttr(default_factory=dict)
+    _tripadvisor_rank_by_date: dict[str, TripAdvisorRank] = PrivateAttr(
+        default_factory=dict
+    )
+    _index_PDCA_by_date: dict[str, IndexPDCA] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context) -> None:
+        for coordinate in self.coordinate:
+            self._coordinate_by_date.setdefault(
+                normalize_manual_date(coordinate.date), coordinate
+            )
+        for tripadvisor in self.tripadvisor_rank:
+            self._tripadvisor_rank_by_date.setdefault(
+                normalize_manual_date(tripadvisor.date), tripadvisor
+            )
+        for index in self.index_PDCA:
+            self._index_PDCA_by_date.setdefault(
+                normalize_manual_date(index.date), index
+            )
+
+    def get_coordinate(self, date: str) -> Coordinate | None:
+        return self._coordinate_by_date.get(normalize_manual_date(date))
+
+    def get_tripadvisor_rank(self, date: str) -> TripAdvisorRank | None:
+        return self._tripadvisor_rank_by_date.get(normalize_manual_date(date))
+
+    def get_index_PDCA(self, date: str) -> IndexPDCA | None:
+        return self._index_PDCA_by_date.get(normalize_manual_date(date))
@@ -0,0 +1,424 @@
+import json
+import os
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+
+from models.GooglePlaceDetail import GooglePlaceDetail
+from models.LocationHistory import LocationHistory
+from models.ObjectiveScore import ObjectiveScore
+
+from geo_area_calculator import (
+    calculate_coverage_ratio,
+    calculate_coverage_ratio_raster,
+    calculate_projected_area,
+    calculate_total_area,
+    calculate_total_polygon,
+)
+from coverage_query import PreparedCoverage
+from get_spread_sheet import (
+    get_latitude_longitude_from_spreadsheet,
+    get_manual_data_for_importance_score,
+)
+from instrumentation import span
+from reporter import PrintReporter, Reporter
+from score_cache import ScoreCache, file_fingerprint, get_score_cache, make_cache_key
+from step_count_store import (
+    STEP_COUNT_JSON_PATH,
+    STEP_COUNT_STORE_PREFIX,
+    ensure_step_count_store,
+    load_step_count_series,
+    parse_step_datetime,
+)
+from trajectory import extract_trajectory_arrays, preprocess_trajectory
+
+# 移動経路の周囲何メートルを移動した範囲とみなすか
+BUFFER_METERS = 80.0
+# バッファを作る前に軌跡の点を減らすときの、元の軌跡とのずれの上限（0で減らさない）
+# バッファの幅の5%のずれであれば、総移動面積の誤差は0.1%未満に収まる
+# (benchmarks.bench_trajectory_preprocess。1割の8mでは滞在の多い軌跡で0.1%を超える)
+TRAJECTORY_TOLERANCE_METERS = BUFFER_METERS * 0.05
+# 拠点駅を中心とした観光範囲円の半径
+COVERAGE_RADIUS_METERS = 1200
+# マスの大きさ（メートル）を指定すると、網羅性スコアを格子による近似で計算する
+# 総移動面積は計算しないが、軌跡の点が多い日やパラメータを変えて試す場合に速い
+COVERAGE_RASTER_CELL_METERS = (
+    float(os.environ["COVERAGE_RASTER_CELL_METERS"])
+    if os.getenv("COVERAGE_RASTER_CELL_METERS")
+    else None
+)
+# 効率性スコアで歩数を数える時間帯と、歩数の上限
+EFFICIENCY_START_TIME = "11:00:00"
+EFFICIENCY_END_TIME = "19:00:00"
+MAX_STEPS = 30000
+
+# 手動入力
+PREDEFINED_SPOTS = frozenset(
+    [
+        "ChIJBYa7A0Iz-F8R6qe7HgH2XV0",
+        "ChIJodnti8vM-V8RVsLa8q-bYRs",
+        "ChIJ7fRyA8jM-V8RNuY11cu1Jlo",
+        "ChIJBYa7A0Iz-F8R6qe7HgH2XV0",
+        "ChIJhycOJtYz-F8RO54LaTG6_p0",
+        "ChIJF_AqPH4z-F8Rmtm1IKiShVQ",
+        "ChIJATPRNwAz-F8RcRE30FR7L78",
+        "ChIJBVmy-YMz-F8R5PID8D17Cpc",
+        "ChIJQ1TRt4cz-F8RxkcdIAmz2QU",
+        "ChIJsfC6oXQz-F8RdA1qXiF6jLs",
+        "ChIJR-yGmXMz-F8Rf07-P4u1PUM",
+        "ChIJBYa7A0Iz-F8R6qe7HgH2XV0",
+        "ChIJDT75skEz-F8RFWwV4pI3cpI",
+    ]
+)
+
+
+@lru_cache(maxsize=None)
+def load_predefined_genres_by_google_places_api() -> dict[str, frozenset[str]]:
+    # Google Places APIで事前定義されているタイプを全て取得する（読み込みは1回だけ）
+    with open("predefined_genres.json", "r", encoding="utf-8") as f:
+        data = json.load(f)
+    predefined_genres = {
+        cat: frozenset(genres["subcategories"]) for cat, genres in data.items()
+    }
+    return predefined_genres
+
+
+@lru_cache(maxsize=None)
+def load_genre_category_index() -> tuple[tuple[str, ...], dict[str, int]]:
+    # カテゴリ名の一覧と、ジャンル→カテゴリ番号の逆引き
+    # 複数のカテゴリに属するジャンルは、先に定義されたカテゴリに属するものとする
+    predefined_genre_categories = load_predefined_genres_by_google_places_api()
+    categories = tuple(predefined_genre_categories)
+    genre_to_category: dict[str, int] = {}
+    for i, genres in enumerate(predefined_genre_categories.values()):
+        for genre in genres:
+            genre_to_category.setdefault(genre, i)
+    return categories, genre_to_category
+
+
+def get_category_bits(genres: Iterable[str]) -> int:
+    # ジャンルが属するカテゴリを、カテゴリ番号のビットを立てた整数で表す
+    _, genre_to_category = load_genre_category_index()
+    bits = 0
+    for genre in genres:
+        if genre in genre_to_category:
+            bits |= 1 << genre_to_category[genre]
+    return bits
+
+
+def get_category_names(bits: int) -> set[str]:
+    categories, _ = load_genre_category_index()
+    return {cat for i, cat in enumerate(categories) if bits >> i & 1}
+
+
+# LocationHistoryをvisitsとactivitiesに分けて戻す
+def split_location_history(
+    locate_histories: list[LocationHistory],
+) -> tuple[list[LocationHistory], list[LocationHistory]]:
+
+    visits: list[LocationHistory] = []
+    activities: list[LocationHistory] = []
+
+    for locate_history in locate_histories:
+        if locate_history.visit:
+            visits.append(locate_history)
+        elif locate_history.activity:
+            activities.append(locate_history)
+
+    return visits, activities
+
+
+# 観光範囲円内の総移動面積の割合 coverage score
+# (網羅性スコア, 総移動面積)を返す（格子による近似の場合、総移動面積はNone）
+# cacheを渡すと、軌跡が同じなら総移動範囲の図形を、拠点の座標も同じなら割合を使い回す
+def calculate_coverage_score(
+    locate_histories: list[LocationHistory],
+    center_lat: float,
+    center_lon: float,
+    reporter: Reporter,
+    cache: ScoreCache | None = None,
+    raster_cell_meters: float | None = COVERAGE_RASTER_CELL_METERS,
+) -> tuple[float, float | None]:
+    with span("extract_trajectory_arrays"):
+        coordinates = extract_trajectory_arrays(locate_histories).latlon
+    reporter.log(coordinates)
+    with span("preprocess_trajectory"):
+        coordinates = preprocess_trajectory(coordinates, TRAJECTORY_TOLERANCE_METERS)
+
+    if raster_cell_meters is not None:
+        with span("calculate_coverage_ratio_raster"):
+            ratio = calculate_coverage_ratio_raster(
+                center_lat,
+                center_lon,
+                COVERAGE_RADIUS_METERS,
+                coordinates,
+                BUFFER_METERS,
+                raster_cell_meters,
+            )
+        reporter.log(
+            "拠点駅を中心とした円内における、総移動面積の占める割合(格子の大きさ",
+            raster_cell_meters,
+            "メートルによる近似): ",
+            ratio,
+            sep="",
+            end="\n\n",
+        )
+        return ratio, None
+
+    polygon_key = make_cache_key("total_polygon", coordinates, BUFFER_METERS)
+    ratio_key = make_cache_key(
+        "coverage", polygon_key, center_lat, center_lon, COVERAGE_RADIUS_METERS
+    )
+    cached = cache.get_value(ratio_key) if cache else None
+    if cached is None:
+        # 総移動面積を計算
+        total_poly = cache.get_geometry(polygon_key) if cache else None
+        if total_poly is None:
+            total_area, total_poly = calculate_total_area(coordinates, BUFFER_METERS)
+            if cache:
+                cache.set_geometry(polygon_key, total_poly)
+        else:
+            with span("calculate_projected_area"):
+                total_area = calculate_projected_area(total_poly)
+
+        # 特定の座標の半径1.2km内の総移動面積の占める割合を計算
+        with span("calculate_coverage_ratio"):
+            ratio = calculate_coverage_ratio(
+                center_lat, center_lon, COVERAGE_RADIUS_METERS, total_poly
+            )
+        if cache:
+            cache.set_value(ratio_key, [ratio, total_area])
+    else:
+        ratio, total_area = cached
+
+    reporter.log(
+        "総移動面積(移動周囲",
+        round(BUFFER_METERS),
+        "メートル): ",
+        total_area,
+        " 平方メートル",
+        sep="",
+    )
+    reporter.log(
+        "拠点駅を中心とした円内における、総移動面積の占める割合:", ratio, end="\n\n"
+    )
+    return ratio, total_area
+
+
+# 複数の拠点の候補と半径の組み合わせごとの網羅性スコアを、(拠点の数, 半径の数) の配列で返す
+# 総移動範囲は1回だけ作り（cacheがあれば保存した図形を使い）、全ての組み合わせで使い回す
+def calculate_coverage_score_grid(
+    locate_histories: list[LocationHistory],
+    centers: list[tuple[float, float]],
+    radii: list[float],
+    cache: ScoreCache | None = None,
+) -> np.ndarray:
+    with span("extract_trajectory_arrays"):
+        coordinates = extract_trajectory_arrays(locate_histories).latlon
+    with span("preprocess_trajectory"):
+        coordinates = preprocess_trajectory(coordinates, TRAJECTORY_TOLERANCE_METERS)
+    polygon_key = make_cache_key("total_polygon", coordinates, BUFFER_METERS)
+    total_poly = cache.get_geometry(polygon_key) if cache else None
+    if total_poly is None:
+        with span("calculate_total_polygon"):
+            total_poly = calculate_total_polygon(coordinates, BUFFER_METERS)
+        if cache:
+            cache.set_geometry(polygon_key, total_poly)
+    with span("calculate_coverage_ratio_grid"):
+        return PreparedCoverage(total_poly).ratio_grid(centers, radii)
+
+
+# 観光スポットのジャンル多様性スコア diversity score
+# (多様性スコア, 訪れたジャンルカテゴリ)を返す
+def calculate_diversity_score(
+    visits: list[LocationHistory],
+    places: dict[str, GooglePlaceDetail],
+    reporter: Reporter,
+) -> tuple[float, set[str]]:
+    all_visited_genres = set()
+    for v in visits:
+        place_id = v.visit.topCandidate.placeID
+        if place_id not in places:
+            continue
+        all_visited_genres.update(places[place_id].types)
+    categories, _ = load_genre_category_index()
+
+    all_visited_categories = get_category_names(get_category_bits(all_visited_genres))
+
+    genre_diversity_score = len(all_visited_categories) / len(categories)
+    reporter.log(all_visited_categories)
+    reporter.log("訪れたジャンルカテゴリの数:", len(all_visited_categories))
+    reporter.log("定義されているジャンルカテゴリの数:", len(categories))
+    reporter.log(
+        "観光スポットのジャンル多様性スコア:", genre_diversity_score, end="\n\n"
+    )
+    return genre_diversity_score, all_visited_categories
+
+
+# 複数日のジャンル多様性スコアをまとめて計算する
+def calculate_diversity_scores(
+    visits_by_date: dict[str, list[LocationHistory]],
+    places: dict[str, GooglePlaceDetail],
+) -> dict[str, float]:
+    categories, _ = load_genre_category_index()
+    # 場所ごとのカテゴリのビット列は、日をまたいで1回だけ計算する
+    place_bits: dict[str, int] = {}
+    diversity_scores: dict[str, float] = {}
+    for date, visits in visits_by_date.items():
+        visited_bits = 0
+        for v in visits:
+            place_id = v.visit.topCandidate.placeID
+            if place_id not in places:
+                continue
+            if place_id not in place_bits:
+                place_bits[place_id] = get_category_bits(places[place_id].types)
+            visited_bits |= place_bits[place_id]
+        diversity_scores[date] = visited_bits.bit_count() / len(categories)
+    return diversity_scores
+
+
+# p@5重要性スコア importance score
+def calculate_importance_score(date: str, reporter: Reporter) -> float:
+    labels = get_manual_data_for_importance_score(date)
+    # p@5 を計算する
+    p_at_5 = sum([1 if v[1] else 0 for v in labels]) / len(labels)
+    reporter.log("p@5(トリップアドバイザーから抽出):", p_at_5, end="\n\n")
+    return p_at_5
+
+
+# 一貫性スコア consistency score
+def calculate_consistency_score(
+    visits: list[LocationHistory],
+    places: dict[str, GooglePlaceDetail],
+    reporter: Reporter,
+) -> float:
+    actually_visited_spots = set([v.visit.topCandidate.placeID for v in visits])
+    for v in visits:
+        _id = v.visit.topCandidate.placeID
+        if _id not in places:
+            continue
+        reporter.log(_id, places[_id].displayName["text"])
+
+    consistency_score = len(PREDEFINED_SPOTS & actually_visited_spots) / len(
+        actually_visited_spots | PREDEFINED_SPOTS
+    )
+    reporter.log(
+        "訪れたスポットのうち、事前に設定されたスポットの比率:",
+        consistency_score,
+        end="\n\n",
+    )
+    return consistency_score
+
+
+# 移動時間比率スコア efficiency score
+# def _calculate_efficiency_score(_activities: list[LocationHistory]) -> float:
+#     total_distance_meters = sum(
+#         float(a.activity.distanceMeters) for a in _activities
+#     )
+#     not_walk_distance_meters = sum(
+#         (
+#             float(a.activity.distanceMeters)
+#             if a.activity.topCandidate.type == "cycling"
+#             else float(a.activity.distanceMeters) * 0.5
+#         )
+#         for a in _activities
+#         if a.activity.topCandidate.type not in ["walking"]
+#     )
+#     _not_walk_ratio = not_walk_distance_meters / total_distance_meters
+#     print("総移動距離:", total_distance_meters)
+#     print("徒歩以外の移動時間:", not_walk_distance_meters)
+#     print("移動時間比率スコア:", _not_walk_ratio, end="\n\n")
+#     return _not_walk_ratio
+
+
+# 歩数による効率性スコア
+# (効率性スコア, 歩数)を返す
+# cacheを渡すと、歩数のファイルが更新されていない限り歩数を読み込まずに済ませる
+def calculate_efficiency_score(
+    date: str, reporter: Reporter, cache: ScoreCache | None = None
+) -> tuple[float, float]:
+    start_time = parse_step_datetime(f"{date} {EFFICIENCY_START_TIME} +0900")
+    end_time = parse_step_datetime(f"{date} {EFFICIENCY_END_TIME} +0900")
+    # 配列を先に作り直しておき、キーが実際に読み込む配列と一致するようにする
+    ensure_step_count_store()
+    step_count_key = make_cache_key(
+        "step_count",
+        file_fingerprint(
+            STEP_COUNT_JSON_PATH,
+            f"{STEP_COUNT_STORE_PREFIX}.epoch.npy",
+            f"{STEP_COUNT_STORE_PREFIX}.qty.npy",
+        ),
+        start_time,
+        end_time,
+    )
+    total_qty = cache.get_value(step_count_key) if cache else None
+    if total_qty is None:
+        with span("load_step_count_series"):
+            steps = load_step_count_series()
+        total_qty = steps.window_sum(start_time, end_time)
+        if cache:
+            cache.set_value(step_count_key, total_qty)
+    reporter.log()
+    reporter.log("歩数量:", total_qty)
+    ratio = (MAX_STEPS - total_qty) / MAX_STEPS
+    reporter.log("歩数比率:", ratio)
+    reporter.log()
+    return ratio, total_qty
+
+
+def calculate_satisfaction_efficiency_correlation() -> float:
+    satisfaction = np.array([0.8, 0.8, 0.8, 1.0, 1.0])
+    efficiency = np.array([0.202, 0.419, 0.482, 0.56, 0.539])
+    return float(np.corrcoef(satisfaction, efficiency)[0, 1])
+
+
+# 客観的スコア
+def calculate_objective_score(
+    locate_histories: list[LocationHistory],
+    places: dict[str, GooglePlaceDetail],
+    reporter: Reporter | None = None,
+    use_cache: bool = False,
+) -> ObjectiveScore:
+    # use_cacheを指定すると、入力が前回から変わっていない指標は保存した値を使う
+    reporter = reporter or PrintReporter()
+    cache = get_score_cache() if use_cache else None
+
+    date = locate_histories[0].startTime.split("T")[0]
+    lat, lon = get_latitude_longitude_from_spreadsheet(date)
+
+    visits, _ = split_location_history(locate_histories)
+
+    with span("coverage"):
+        coverage_score, total_area = calculate_coverage_score(
+            locate_histories, lat, lon, reporter, cache
+        )
+    with span("diversity"):
+        genre_diversity_score, visited_categories = calculate_diversity_score(
+            visits, places, reporter
+        )
+    with span("importance"):
+        importance_score = calculate_importance_score(date, reporter)
+    with span("consistency"):
+        consistency_score = calculate_consistency_score(visits, places, reporter)
+    with span("efficiency"):
+        efficiency_score, step_count = calculate_efficiency_score(date, reporter, cache)
+
+    reporter.log()
+    reporter.log("網羅性: ", coverage_score)
+    reporter.log("多様性: ", genre_diversity_score)
+    reporter.log("重要性: ", importance_score)
+    reporter.log("一貫性: ", consistency_score)
+    reporter.log("効率性: ", efficiency_score)
+
+    return ObjectiveScore(
+        date=date,
+        coverage=coverage_score,
+        diversity=genre_diversity_score,
+        importance=importance_score,
+        consistency=consistency_score,
+        efficiency=efficiency_score,
+        total_area=total_area,
+        visited_categories=sorted(visited_categories),
+        step_count=step_count,
+    )
@@ -0,0 +1,173 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+PLACES_CACHE_PATH = "places.sqlite3"
+# 旧形式のキャッシュ (places/{place_id}.json)
+LEGACY_PLACES_CACHE_DIR = "places"
+
+DEFAULT_TTL_SECONDS = 180 * 24 * 60 * 60
+DEFAULT_NEGATIVE_TTL_SECONDS = 30 * 24 * 60 * 60
+DEFAULT_MAX_MEMORY_ENTRIES = 4096
+# メモリ上の値はこの秒数が経過したら永続化先から読み直し、TTLを反映させる
+DEFAULT_MEMORY_TTL_SECONDS = 60 * 60
+
+
+class PlacesStore(Protocol):
+    # キャッシュの永続化先が実装するインターフェース
+    # getは (見つかったか, データ) を返し、データがNoneのものは取得に失敗したIDを表す
+    def get(self, place_id: str) -> tuple[bool, dict | None]: ...
+
+    def set(self, place_id: str, data: dict | None, status_code: int) -> None: ...
+
+    def delete(self, place_id: str) -> None: ...
+
+
+class SqlitePlacesStore:
+    # 全ての場所の詳細を1つのSQLiteファイルにまとめて保存する
+    def __init__(
+        self,
+        path: str = PLACES_CACHE_PATH,
+        ttl_seconds: float | None = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float | None = DEFAULT_NEGATIVE_TTL_SECONDS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS places ("
+                " place_id TEXT PRIMARY KEY,"
+                " fetched_at REAL NOT NULL,"
+                " status_code INTEGER NOT NULL,"
+                " data TEXT"
+                ")"
+            )
+
+    def _is_expired(self, fetched_at: float, is_negative: bool) -> bool:
+        ttl = self.negative_ttl_seconds if is_negative else self.ttl_seconds
+        return ttl is not None and time.time() - fetched_at > ttl
+
+    def get(self, place_id: str) -> tuple[bool, dict | None]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, data FROM places WHERE place_id = ?", (place_id,)
+            ).fetchone()
+        if row is None:
+            return False, None
+        fetched_at, data = row
+        if self._is_expired(fetched_at, data is None):
+            return False, None
+        return True, None if data is None else json.loads(data)
+
+    def set(
+        self,
+        place_id: str,
+        data: dict | None,
+        status_code: int = 200,
+        fetched_at: float | None = None,
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?)",
+                (
+                    place_id,
+                    time.time() if fetched_at is None else fetched_at,
+                    status_code,
+                    None if data is None else json.dumps(data, ensure_ascii=False),
+                ),
+            )
+
+    def delete(self, place_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM places WHERE place_id = ?", (place_id,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class PlacesCache:
+    # プロセス内のLRUを永続化先の前段に置き、ファイルI/Oを減らす
+    def __init__(
+        self,
+        store: PlacesStore,
+        max_memory_entries: int = DEFAULT_MAX_MEMORY_ENTRIES,
+        memory_ttl_seconds: float = DEFAULT_MEMORY_TTL_SECONDS,
+    ):
+        self.store = store
+        self.max_memory_entries = max_memory_entries
+        self.memory_ttl_seconds = memory_ttl_seconds
+        self._memory: OrderedDict[str, tuple[float, dict | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, place_id: str, data: dict | None) -> None:
+        with self._lock:
+            self._memory[place_id] = (time.monotonic(), data)
+            self._memory.move_to_end(place_id)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, place_id: str) -> tuple[bool, dict | None]:
+        with self._lock:
+            if place_id in self._memory:
+                loaded_at, data = self._memory[place_id]
+                if time.monotonic() - loaded_at <= self.memory_ttl_seconds:
+                    self._memory.move_to_end(place_id)
+                    return True, data
+                del self._memory[place_id]
+        found, data = self.store.get(place_id)
+        if found:
+            self._remember(place_id, data)
+        return found, data
+
+    def set(self, place_id: str, data: dict | None, status_code: int = 200) -> None:
+        self.store.set(place_id, data, status_code)
+        self._remember(place_id, data)
+
+    def delete(self, place_id: str) -> None:
+        with self._lock:
+            self._memory.pop(place_id, None)
+        self.store.delete(place_id)
+
+
+_PLACES_CACHE: PlacesCache | None = None
+_PLACES_CACHE_LOCK = threading.Lock()
+
+
+def get_places_cache() -> PlacesCache:
+    global _PLACES_CACHE
+    with _PLACES_CACHE_LOCK:
+        if _PLACES_CACHE is None:
+            _PLACES_CACHE = PlacesCache(SqlitePlacesStore())
+        return _PLACES_CACHE
+
+
+def import_places_directory(
+    store: SqlitePlacesStore, directory: str = LEGACY_PLACES_CACHE_DIR
+) -> int:
+    # 旧形式のplaces/{place_id}.jsonを取り込む
+    # 旧形式のキャッシュには期限がなかったため、取り込んだ時点を取得日時としてTTLを数え始める
+    # （ファイルの更新日時にすると、古いファイルは取り込んだ直後に期限切れとなり取得し直される）
+    imported_at = time.time()
+    count = 0
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        filepath = os.path.join(directory, filename)
+        with open(filepath, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        store.set(filename[:-5], data, 200, fetched_at=imported_at)
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    places_store = SqlitePlacesStore()
+    num_places = import_places_directory(places_store)
+    places_store.close()
+    print(f"{num_places} places imported into '{PLACES_CACHE_PATH}'")
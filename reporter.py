@@ -0,0 +1,20 @@
+from typing import Protocol
+
+
+class Reporter(Protocol):
+    # スコア計算の途中経過の出力先（printと同じ引数をとる）
+    # 呼び出し側は値をそのまま渡し、文字列への変換は出力するReporterの中だけで行う
+    # 出力しない場合は変換の手間もかけない
+    def log(self, *values: object, sep: str = " ", end: str = "\n") -> None: ...
+
+
+class PrintReporter:
+    # 標準出力にそのまま出力する
+    def log(self, *values: object, sep: str = " ", end: str = "\n") -> None:
+        print(*values, sep=sep, end=end)
+
+
+class QuietReporter:
+    # 何も出力しない（バッチ処理やサービスから使う）
+    def log(self, *values: object, sep: str = " ", end: str = "\n") -> None:
+        pass
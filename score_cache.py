@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+# スコア計算の途中結果と結果を、入力の内容から作ったキーで保存する
+# 入力が変わっていない指標は、再実行時に保存した値を使い回す
+SCORE_CACHE_PATH = os.getenv("SCORE_CACHE_PATH", "score_cache.sqlite3")
+# 計算方法を変えたときに上げると、以前の結果を全て使わなくなる
+SCORE_CACHE_VERSION = 1
+
+
+def make_cache_key(name: str, *parts: object) -> str:
+    # 配列とbytesはその中身、それ以外はJSONに変換した文字列からハッシュを作る
+    h = hashlib.sha256(f"{name}:{SCORE_CACHE_VERSION}".encode())
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part).tobytes()
+        if not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True, ensure_ascii=False).encode()
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return f"{name}:{h.hexdigest()}"
+
+
+def file_fingerprint(*paths: str) -> list[tuple[str, int, int]]:
+    # 大きなファイルは中身を読まず、存在するファイルのサイズと更新日時で代用する
+    return [
+        (path, os.path.getsize(path), os.stat(path).st_mtime_ns)
+        for path in paths
+        if os.path.exists(path)
+    ]
+
+
+class ScoreCache:
+    # 値はJSON、図形はWKBとして1つのSQLiteファイルに保存する
+    def __init__(self, path: str = SCORE_CACHE_PATH):
+        self._lock = threading.Lock()
+        # 複数のプロセスから同時に書き込むため、ロックの解除を待つ
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " key TEXT PRIMARY KEY,"
+                " created_at REAL NOT NULL,"
+                " value BLOB NOT NULL"
+                ")"
+            )
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM artifacts WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def _set(self, key: str, value: bytes) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?)",
+                (key, time.time(), value),
+            )
+
+    def get_value(self, key: str) -> object | None:
+        value = self._get(key)
+        return None if value is None else json.loads(value)
+
+    def set_value(self, key: str, value: object) -> None:
+        self._set(key, json.dumps(value, ensure_ascii=False).encode())
+
+    def get_geometry(self, key: str) -> BaseGeometry | None:
+        value = self._get(key)
+        return None if value is None else shapely.from_wkb(value)
+
+    def set_geometry(self, key: str, geometry: BaseGeometry) -> None:
+        self._set(key, shapely.to_wkb(geometry))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM artifacts")
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_SCORE_CACHE: ScoreCache | None = None
+_SCORE_CACHE_PID: int | None = None
+_SCORE_CACHE_LOCK = threading.Lock()
+
+
+def get_score_cache() -> ScoreCache:
+    # SQLiteの接続はプロセス間で共有できないため、プロセスごとに開き直す
+    global _SCORE_CACHE, _SCORE_CACHE_PID
+    with _SCORE_CACHE_LOCK:
+        if _SCORE_CACHE is None or _SCORE_CACHE_PID != os.getpid():
+            _SCORE_CACHE = ScoreCache()
+            _SCORE_CACHE_PID = os.getpid()
+        return _SCORE_CACHE
@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from models.ObjectiveScore import ObjectiveScore
+
+from get_spread_sheet import clear_spreadsheet_manual_data, get_spreadsheet_manual_data
+from google_places import prefetch_google_place_details
+from main import load_location_history_for_date
+from objective_score import calculate_objective_score, load_genre_category_index
+from places_cache import get_places_cache
+from reporter import QuietReporter
+from step_count_store import clear_step_count_series, load_step_count_series
+
+# スコア計算に使うデータを読み込んだまま待ち受け、日付ごとのスコアを返すローカルサーバー
+# リポジトリのルートから python scoring_service.py で起動する
+#   GET  /score?date=2025-02-16    その日のスコアを計算して返す
+#   GET  /results?date=2025-02-16  計算済みのスコアを返す（dateを省くと全て）
+#   GET  /health                   起動してからの秒数と計算済みの日付
+#   POST /reload                   手動入力データと歩数を読み直し、計算済みのスコアを捨てる
+SCORING_SERVICE_HOST = os.getenv("SCORING_SERVICE_HOST", "127.0.0.1")
+SCORING_SERVICE_PORT = int(os.getenv("SCORING_SERVICE_PORT", "8765"))
+
+
+class ScoringService:
+    def __init__(self):
+        self.started_at = time.time()
+        self.results: dict[str, ObjectiveScore] = {}
+        # スコアの計算は1件ずつ行い、計算済みのスコアの取得は待たせない
+        self._score_lock = threading.Lock()
+        self._results_lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        # 最初の要求を待たずに、手動入力データ・ジャンル・キャッシュ・歩数を読み込んでおく
+        get_spreadsheet_manual_data()
+        load_genre_category_index()
+        get_places_cache()
+        load_step_count_series()
+
+    def score(self, date: str) -> ObjectiveScore:
+        with self._score_lock:
+            locate_histories = load_location_history_for_date(date)
+            if not locate_histories:
+                raise FileNotFoundError(f"Location history not found for {date}")
+            places, _ = prefetch_google_place_details(locate_histories)
+            score = calculate_objective_score(
+                locate_histories, places, QuietReporter(), use_cache=True
+            )
+        with self._results_lock:
+            self.results[date] = score
+        return score
+
+    def get_results(self, date: str | None = None) -> list[ObjectiveScore]:
+        with self._results_lock:
+            if date is None:
+                return [self.results[d] for d in sorted(self.results)]
+            return [self.results[date]] if date in self.results else []
+
+    def reload(self) -> None:
+        with self._score_lock, self._results_lock:
+            clear_spreadsheet_manual_data()
+            clear_step_count_series()
+            self.results.clear()
+            # スナップショットが新しくても、Sheets APIから取得し直す
+            get_spreadsheet_manual_data(max_age_seconds=0)
+            load_step_count_series()
+
+
+def _parse_date(query: dict[str, list[str]]) -> str | None:
+    if "date" not in query:
+        return None
+    date = query["date"][0]
+    # 日付として正しいことを確認する（不正な場合はValueError）
+    datetime.strptime(date, "%Y-%m-%d")
+    return date
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    service: ScoringService
+
+    def _send_json(self, status: int, body: object) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str) -> None:
+        self._send_json(status, {"error": message})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            date = _parse_date(query)
+        except ValueError:
+            self._send_error(400, f"Invalid date: {query['date'][0]}")
+            return
+
+        if url.path == "/health":
+            self._send_json(
+                200,
+                {
+                    "uptime_seconds": time.time() - self.service.started_at,
+                    "dates": [s.date for s in self.service.get_results()],
+                },
+            )
+        elif url.path == "/score":
+            if date is None:
+                self._send_error(400, "Query parameter 'date' is required")
+                return
+            try:
+                start = time.perf_counter()
+                score = self.service.score(date)
+            except FileNotFoundError as e:
+                self._send_error(404, str(e))
+                return
+            except Exception as e:
+                self._send_error(500, repr(e))
+                return
+            self._send_json(
+                200,
+                {
+                    "score": score.model_dump(mode="json"),
+                    "elapsed_seconds": time.perf_counter() - start,
+                },
+            )
+        elif url.path == "/results":
+            results = self.service.get_results(date)
+            if date is not None and not results:
+                self._send_error(404, f"No result for {date}")
+                return
+            self._send_json(200, [s.model_dump(mode="json") for s in results])
+        else:
+            self._send_error(404, f"Not found: {url.path}")
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/reload":
+            self._send_error(404, f"Not found: {self.path}")
+            return
+        try:
+            self.service.reload()
+        except Exception as e:
+            self._send_error(500, repr(e))
+            return
+        self._send_json(200, {"reloaded": True})
+
+
+def create_server(
+    service: ScoringService,
+    host: str = SCORING_SERVICE_HOST,
+    port: int = SCORING_SERVICE_PORT,
+) -> ThreadingHTTPServer:
+    handler = type("Handler", (ScoringRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    service = ScoringService()
+    service.warm_up()
+    server = create_server(service)
+    print(
+        f"Scoring service listening on http://{SCORING_SERVICE_HOST}:{SCORING_SERVICE_PORT}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from instrumentation import span
+
+STEP_COUNT_JSON_PATH = "data/StepCount_10sec.json"
+# {prefix}.epoch.npy (int64, UNIX時間の秒) と {prefix}.qty.npy (float32) の組で保存する
+STEP_COUNT_STORE_PREFIX = "data/StepCount_10sec"
+
+
+def parse_step_datetime(date_str: str) -> int:
+    # "2025-01-14 06:15:20 +0900"形式の文字列をUNIX時間の秒に変換
+    return int(datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S %z").timestamp())
+
+
+@lru_cache(maxsize=None)
+def _utc_offset_seconds(offset_str: str) -> int:
+    # "+0900"形式のUTCからの時差を秒に変換
+    sign = -1 if offset_str[0] == "-" else 1
+    return sign * (int(offset_str[1:3]) * 3600 + int(offset_str[3:5]) * 60)
+
+
+def _split_step_datetime(date_str: str) -> tuple[str, str]:
+    # 現地時刻とUTCからの時差に分ける
+    local, _, offset_str = date_str.rpartition(" ")
+    if len(local) != 19:
+        # 以前の10秒単位の集計では秒が0埋めされていない ("2025-02-16 10:00:0")
+        local = datetime.strptime(local, "%Y-%m-%d %H:%M:%S").isoformat(sep=" ")
+    return local, offset_str
+
+
+def parse_step_datetime_array(date_strs: list[str]) -> np.ndarray:
+    # parse_step_datetimeと同じ変換を、文字列の切り出しとNumPyでまとめて行う
+    locals_, offset_strs = [], []
+    for date_str in date_strs:
+        local, offset_str = _split_step_datetime(date_str)
+        locals_.append(local)
+        offset_strs.append(offset_str)
+    local_epoch = np.array(locals_, dtype="datetime64[s]").astype(np.int64)
+    offsets = np.array(
+        [_utc_offset_seconds(offset_str) for offset_str in offset_strs],
+        dtype=np.int64,
+    )
+    return local_epoch - offsets
+
+
+def _store_paths(store_prefix: str) -> tuple[str, str]:
+    return f"{store_prefix}.epoch.npy", f"{store_prefix}.qty.npy"
+
+
+class StepCountSeries:
+    # 時刻順に並んだ歩数の時系列。累積和を持ち、任意の区間の合計を二分探索で求める
+    def __init__(self, epoch: np.ndarray, qty: np.ndarray):
+        if len(epoch) > 1 and np.any(epoch[1:] < epoch[:-1]):
+            order = np.argsort(epoch, kind="stable")
+            epoch, qty = epoch[order], qty[order]
+        self.epoch = epoch
+        self.qty = qty
+        self._prefix_sum = np.concatenate(([0.0], np.cumsum(qty, dtype=np.float64)))
+
+    def __len__(self) -> int:
+        return len(self.epoch)
+
+    def window_sums(
+        self, start_epochs: np.ndarray, end_epochs: np.ndarray
+    ) -> np.ndarray:
+        # 区間[start, end]（両端を含む）ごとの歩数の合計
+        lo = np.searchsorted(self.epoch, start_epochs, side="left")
+        hi = np.searchsorted(self.epoch, end_epochs, side="right")
+        return self._prefix_sum[hi] - self._prefix_sum[lo]
+
+    def window_sum(self, start_epoch: int, end_epoch: int) -> float:
+        return float(
+            self.window_sums(np.array([start_epoch]), np.array([end_epoch]))[0]
+        )
+
+    def save(self, store_prefix: str = STEP_COUNT_STORE_PREFIX) -> None:
+        # メモリマップで読み込み中の配列を壊さないよう、別のファイルに書いてから置き換える
+        for path, array in zip(
+            _store_paths(store_prefix),
+            (self.epoch.astype(np.int64), self.qty.astype(np.float32)),
+        ):
+            # 複数のプロセスが同時に作り直しても互いの書きかけを壊さないよう、一時ファイルの
+            # 名前は書き込むたびに変える
+            with tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(path) or ".", suffix=".tmp", delete=False
+            ) as f:
+                np.save(f, array)
+            os.replace(f.name, path)
+
+
+def build_step_count_store(
+    json_path: str = STEP_COUNT_JSON_PATH,
+    store_prefix: str = STEP_COUNT_STORE_PREFIX,
+) -> StepCountSeries:
+    # JSON形式の歩数データを一度だけ解析し、配列として保存する
+    with span("parse_step_count_json"):
+        with open(json_path, "r") as f:
+            steps = json.load(f)
+        epoch = parse_step_datetime_array([item["date"] for item in steps])
+        qty = np.array([item["qty"] for item in steps], dtype=np.float32)
+    series = StepCountSeries(epoch, qty)
+    series.save(store_prefix)
+    return series
+
+
+def _is_store_stale(store_prefix: str, json_path: str) -> bool:
+    epoch_path, _ = _store_paths(store_prefix)
+    return not os.path.exists(epoch_path) or (
+        os.path.exists(json_path)
+        and os.path.getmtime(json_path) > os.path.getmtime(epoch_path)
+    )
+
+
+def ensure_step_count_store(
+    store_prefix: str = STEP_COUNT_STORE_PREFIX,
+    json_path: str = STEP_COUNT_JSON_PATH,
+) -> None:
+    # JSONの方が新しい場合は、配列を読み込む前に作り直しておく
+    if _is_store_stale(store_prefix, json_path):
+        build_step_count_store(json_path, store_prefix)
+
+
+def _file_mtimes(*paths: str) -> tuple[int | None, ...]:
+    return tuple(
+        os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in paths
+    )
+
+
+# (store_prefix, json_path) ごとの、読み込んだときのファイルの更新日時と時系列
+_STEP_COUNT_SERIES: dict[
+    tuple[str, str], tuple[tuple[int | None, ...], StepCountSeries]
+] = {}
+_STEP_COUNT_SERIES_LOCK = threading.Lock()
+
+
+def load_step_count_series(
+    store_prefix: str = STEP_COUNT_STORE_PREFIX,
+    json_path: str = STEP_COUNT_JSON_PATH,
+) -> StepCountSeries:
+    # 保存済みの配列をメモリマップで読み込む（JSONの方が新しい場合は作り直す）
+    # 読み込んだ時系列はプロセス内で使い回し、ファイルが更新されたときだけ読み直す
+    key = (store_prefix, json_path)
+    with _STEP_COUNT_SERIES_LOCK:
+        cached = _STEP_COUNT_SERIES.get(key)
+        if cached is not None and cached[0] == _file_mtimes(
+            json_path, *_store_paths(store_prefix)
+        ):
+            return cached[1]
+        if _is_store_stale(store_prefix, json_path):
+            series = build_step_count_store(json_path, store_prefix)
+        else:
+            epoch_path, qty_path = _store_paths(store_prefix)
+            series = StepCountSeries(
+                np.load(epoch_path, mmap_mode="r"), np.load(qty_path, mmap_mode="r")
+            )
+        _STEP_COUNT_SERIES[key] = (
+            _file_mtimes(json_path, *_store_paths(store_prefix)),
+            series,
+        )
+        return series
+
+
+def clear_step_count_series() -> None:
+    # 次回のload_step_count_seriesで、ファイルから読み直す
+    with _STEP_COUNT_SERIES_LOCK:
+        _STEP_COUNT_SERIES.clear()
+
+
+if __name__ == "__main__":
+    step_count_series = build_step_count_store()
+    print(f"{len(step_count_series)} steps stored in '{STEP_COUNT_STORE_PREFIX}.*.npy'")
@@ -0,0 +1,187 @@
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+import shapely
+from shapely.geometry import LineString
+
+from geo_area_calculator import R
+from models.LocationHistory import LocationHistory
+from models.LocationRecord import LocationRecord
+
+# 座標の種類
+KIND_ACTIVITY_START = 0  # 移動の開始地点
+KIND_ACTIVITY_END = 1  # 移動の終了地点
+KIND_VISIT = 2  # 訪れた場所
+
+
+@dataclass
+class TrajectoryArrays:
+    # LocationHistoryから取り出した座標を、点ごとに並べた列指向の配列
+    lat: np.ndarray  # float64
+    lon: np.ndarray  # float64
+    start_time: np.ndarray  # int64 (UNIX時間の秒)
+    end_time: np.ndarray  # int64 (UNIX時間の秒)
+    kind: np.ndarray  # int8 (KIND_*)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    @property
+    def latlon(self) -> np.ndarray:
+        # (緯度, 経度)の組を並べた (N, 2) の配列
+        return np.column_stack((self.lat, self.lon))
+
+
+def parse_geo_array(geo_strs: list[str]) -> np.ndarray:
+    # "geo:35.6,139.5"形式の文字列をまとめて (N, 2) の配列に変換する
+    if not geo_strs:
+        return np.empty((0, 2), dtype=np.float64)
+    # 区切りが欠けた文字列があると前後の組がずれるため、組の数が合わない場合はエラーにする
+    if any(geo_str.count(",") != 1 for geo_str in geo_strs):
+        raise ValueError("Error: geo string must have exactly two coordinates")
+    joined = ",".join(geo_str[4:] for geo_str in geo_strs)
+    values = np.fromstring(joined, dtype=np.float64, sep=",")
+    if len(values) != 2 * len(geo_strs):
+        raise ValueError("Error: failed to parse geo strings")
+    return values.reshape(-1, 2)
+
+
+def parse_epoch_seconds(datetime_str: str) -> int:
+    return int(datetime.fromisoformat(datetime_str).timestamp())
+
+
+@lru_cache(maxsize=None)
+def _utc_offset_seconds(offset_str: str) -> int:
+    # "+09:00"形式のUTCからの時差を秒に変換
+    sign = -1 if offset_str[0] == "-" else 1
+    return sign * (int(offset_str[1:3]) * 3600 + int(offset_str[4:6]) * 60)
+
+
+def parse_epoch_seconds_array(datetime_strs: list[str]) -> np.ndarray:
+    # parse_epoch_secondsと同じ変換を、文字列の切り出しとNumPyでまとめて行う
+    # 時差が"+09:00"形式でない文字列（"Z"や時差なし）が含まれる場合は1つずつ変換する
+    locals_, offset_strs = [], []
+    for datetime_str in datetime_strs:
+        offset_str = datetime_str[-6:]
+        if offset_str[:1] not in ("+", "-") or offset_str[3:4] != ":":
+            return np.array(
+                [parse_epoch_seconds(s) for s in datetime_strs], dtype=np.int64
+            )
+        locals_.append(datetime_str[:-6])
+        offset_strs.append(offset_str)
+    local_epoch = np.array(locals_, dtype="datetime64[us]").astype(np.int64)
+    offsets = np.array(
+        [_utc_offset_seconds(offset_str) for offset_str in offset_strs],
+        dtype=np.int64,
+    )
+    return local_epoch // 1_000_000 - offsets
+
+
+def extract_trajectory_arrays(
+    locate_histories: Iterable[LocationHistory] | Iterable[LocationRecord],
+) -> TrajectoryArrays:
+    # 移動は開始地点と終了地点、訪問は場所の座標を、記録順に1点ずつ取り出す
+    # LocationRecordは読み込み時に座標を変換済みなので、そのまま使う
+    # 時刻は文字列のまま集めておき、最後にまとめて変換する
+    geo_strs: list[str] = []
+    latlons: list[tuple[float, float]] = []
+    start_strs: list[str] = []
+    end_strs: list[str] = []
+    rows: list[int] = []  # 点ごとの、時刻を取り出したレコードの番号
+    kinds: list[int] = []
+    for locate_history in locate_histories:
+        points = latlons if isinstance(locate_history, LocationRecord) else geo_strs
+        row = len(start_strs)
+        start_strs.append(locate_history.startTime)
+        end_strs.append(locate_history.endTime)
+        if locate_history.activity:
+            points.append(locate_history.activity.start)
+            points.append(locate_history.activity.end)
+            rows += [row, row]
+            kinds += [KIND_ACTIVITY_START, KIND_ACTIVITY_END]
+        if (
+            locate_history.visit
+            and locate_history.visit.topCandidate
+            and locate_history.visit.topCandidate.placeLocation
+        ):
+            points.append(locate_history.visit.topCandidate.placeLocation)
+            rows.append(row)
+            kinds.append(KIND_VISIT)
+
+    if geo_strs and latlons:
+        raise ValueError("Error: LocationHistory and LocationRecord are mixed")
+    if latlons:
+        latlon = np.array(latlons, dtype=np.float64)
+    else:
+        latlon = parse_geo_array(geo_strs)
+    kind = np.array(kinds, dtype=np.int8)
+    rows_array = np.array(rows, dtype=np.intp)
+    start_epoch = parse_epoch_seconds_array(start_strs)[rows_array]
+    end_epoch = parse_epoch_seconds_array(end_strs)[rows_array]
+    # 移動の開始地点と終了地点は、それぞれ移動の開始時刻と終了時刻の1点
+    start_time = np.where(kind == KIND_ACTIVITY_END, end_epoch, start_epoch)
+    end_time = np.where(kind == KIND_ACTIVITY_START, start_epoch, end_epoch)
+    return TrajectoryArrays(
+        lat=latlon[:, 0].copy(),
+        lon=latlon[:, 1].copy(),
+        start_time=start_time,
+        end_time=end_time,
+        kind=kind,
+    )
+
+
+def meters_to_buffer_degrees(meters: float) -> float:
+    # calculate_total_polygonと同じく、経緯度の空間での距離に換算する
+    return meters / R * 180 / math.pi
+
+
+def remove_consecutive_duplicates(latlon: np.ndarray) -> np.ndarray:
+    # 移動の終了地点と次の訪問の場所のように、連続して同じ座標が並ぶものを1つにする
+    if len(latlon) < 2:
+        return latlon
+    keep = np.ones(len(latlon), dtype=bool)
+    keep[1:] = np.any(latlon[1:] != latlon[:-1], axis=1)
+    return latlon[keep]
+
+
+def collapse_stay_points(latlon: np.ndarray, radius_meters: float) -> np.ndarray:
+    # 直前に残した点から半径以内に留まっている点を除く（最初と最後の点は残す）
+    # 除いた点は残した点から半径以内にあるため、元の軌跡とのずれは半径以下に収まる
+    if len(latlon) < 3:
+        return latlon
+    radius2 = meters_to_buffer_degrees(radius_meters) ** 2
+    points = latlon.tolist()
+    keep = [0]
+    anchor_lat, anchor_lon = points[0]
+    for i in range(1, len(points) - 1):
+        lat, lon = points[i]
+        if (lat - anchor_lat) ** 2 + (lon - anchor_lon) ** 2 > radius2:
+            keep.append(i)
+            anchor_lat, anchor_lon = lat, lon
+    keep.append(len(points) - 1)
+    return latlon[keep]
+
+
+def simplify_path(latlon: np.ndarray, tolerance_meters: float) -> np.ndarray:
+    # Douglas-Peucker法で、元の軌跡とのずれがtolerance_meters以下になるように点を間引く
+    if len(latlon) < 3:
+        return latlon
+    line = LineString(latlon[:, ::-1])
+    simplified = shapely.simplify(
+        line, meters_to_buffer_degrees(tolerance_meters), preserve_topology=False
+    )
+    return shapely.get_coordinates(simplified)[:, ::-1]
+
+
+def preprocess_trajectory(latlon: np.ndarray, tolerance_meters: float) -> np.ndarray:
+    # バッファを作る前に、総移動範囲がほぼ変わらない範囲で点を減らす
+    # 滞在点の集約と間引きに許容誤差を半分ずつ割り当て、元の軌跡とのずれをtolerance_meters以下にする
+    if tolerance_meters <= 0:
+        return latlon
+    latlon = remove_consecutive_duplicates(latlon)
+    latlon = collapse_stay_points(latlon, tolerance_meters / 2)
+    return simplify_path(latlon, tolerance_meters / 2)